@@ -2,20 +2,137 @@ import os
 import sys
 import time
 import json
+import re
+import logging
+import asyncio
 import argparse
-from dotenv import load_dotenv
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
+from importlib import import_module
 
+# Light modules only - the media stack (MoviePy, Playwright, Pillow) is imported
+# lazily via _load_module once we know there is news to turn into a video.
 from src.news_fetcher import NewsFetcher
 from src.script_gen import ScriptGenerator
-from src.audio_gen import AudioGenerator
-from src.visual_gen import VisualGenerator
-from src.video_editor import VideoEditor
 from src.dedup_manager import DedupManager
+from src.script_cleaner import clean_script_text
 
 import random
 
+# Max segments rendered at once (caps parallel browser instances)
+SEGMENT_CONCURRENCY = 4
+
+# All invalid filename characters: ? * : " < > | / \ and also & =
+_UNSAFE_FILENAME_RE = re.compile(r'[?*:"<>|/\\&=\n\r]')
+
+def _load_module(module_name, class_name):
+    """Imports src.<module_name> on demand and constructs its main class."""
+    return getattr(import_module(f"src.{module_name}"), class_name)()
+
+def _safe_filename_part(article_id):
+    """Sanitize Filename - Remove ALL invalid characters for Windows/Linux/Artifact upload."""
+    safe_article_id = _UNSAFE_FILENAME_RE.sub('', str(article_id))
+    # Replace remaining problematic chars
+    safe_article_id = safe_article_id.replace('.', '_').replace(' ', '_')
+    # Limit length to avoid path issues
+    return safe_article_id[:50]
+
+def _source_name(article):
+    """Extract a display source name from the article URL for credibility."""
+    source_url = article.get("source_url", "") or article.get("article_id", "")
+    source_name = "News"
+    if source_url:
+        # Extract domain name (e.g., "bbc.com" -> "BBC")
+        try:
+            domain = urllib.parse.urlparse(source_url).netloc
+            # Clean up domain: remove www., get main name
+            domain = domain.replace("www.", "").split(".")[0]
+            # Capitalize known sources
+            source_map = {
+                "bbc": "BBC News", "cnn": "CNN", "ndtv": "NDTV",
+                "timesofindia": "Times of India", "indianexpress": "Indian Express",
+                "hindustantimes": "Hindustan Times", "thehindu": "The Hindu",
+                "reuters": "Reuters", "aljazeera": "Al Jazeera",
+                "theguardian": "The Guardian", "zeenews": "Zee News",
+                "news18": "News18", "deccanherald": "Deccan Herald",
+                "livemint": "Mint", "npr": "NPR", "skynews": "Sky News",
+                "france24": "France24", "dw": "DW News", "abcnews": "ABC News"
+            }
+            source_name = source_map.get(domain.lower(), domain.capitalize())
+        except:
+            source_name = "Verified Source"
+    return source_name
+
+async def _generate_segments(audio_gen, visual_gen, article, segments, headline_text, ticker_text):
+    """
+    Generates audio + overlay + ticker for every segment concurrently.
+    Segments are independent, so running them together collapses wall time
+    from N x T to ~T. Results keep the original segment order.
+    """
+    source_name = _source_name(article)
+    semaphore = asyncio.Semaphore(SEGMENT_CONCURRENCY)
+
+    # COMPREHENSIVE AUDIO CLEANUP - SECOND LINE OF DEFENSE
+    clean_texts = [clean_script_text(seg.get("script", "")) for seg in segments]
+
+    # 4a. Audio - all segments in one batch (a single ElevenLabs request instead of N)
+    audio_paths = [f"generated/segment_{article['article_id']}_{idx}.mp3" for idx in range(len(segments))]
+    audio_task = asyncio.create_task(asyncio.to_thread(audio_gen.generate_audio_batch, clean_texts, audio_paths))
+
+    # 4c. Ticker - text is the same for every segment, so render it ONCE and share the path
+    ticker_task = asyncio.create_task(asyncio.to_thread(visual_gen.generate_ticker_image, ticker_text, "ticker_strip.png"))
+
+    async def render_segment(idx):
+        async with semaphore:
+            print(f"Processing Segment {idx+1}/{len(segments)}...")
+
+            # 4b. Visual
+            img_path = f"slide_{idx}.png"
+            return await asyncio.to_thread(
+                visual_gen.generate_overlay,
+                headline=headline_text,
+                ticker_text=ticker_text,
+                summary_text=clean_texts[idx],
+                filename=img_path,
+                source_name=source_name
+            )
+
+    overlays = await asyncio.gather(*[render_segment(idx) for idx in range(len(segments))])
+    audio_results = await audio_task
+    ticker_full_path = await ticker_task
+
+    final_segments = []
+    for idx, (audio_ok, full_img_path) in enumerate(zip(audio_results, overlays)):
+        if not audio_ok:
+            print(f"Failed audio for segment {idx}")
+            continue
+        if full_img_path:
+            final_segments.append({
+                "audio": audio_paths[idx],
+                "image": full_img_path,
+                "ticker_image": ticker_full_path
+            })
+    return final_segments
+
+async def _generate_assets(audio_gen, visual_gen, article, script_data, segments, headline_text, ticker_text):
+    """
+    Runs the background download alongside segment generation.
+    Returns (final_segments, bg_path, bg_type).
+    """
+    # Background fetch is independent of the segments - start it first so the
+    # download is hidden behind TTS/rendering instead of running after it.
+    bg_task = asyncio.create_task(asyncio.to_thread(
+        visual_gen.get_background_video, article, script_data.get("video_search_keywords", [])
+    ))
+    final_segments = await _generate_segments(audio_gen, visual_gen, article, segments, headline_text, ticker_text)
+    bg_path, bg_type = await bg_task
+    return final_segments, bg_path, bg_type
+
 def main():
+    from dotenv import load_dotenv
     load_dotenv()
+    # Per-article/per-feed traces are logger.debug; LOG_LEVEL=DEBUG shows them
+    logging.basicConfig(level=os.getenv("LOG_LEVEL", "WARNING").upper(), format="%(message)s")
     
     # Parse command line arguments
     parser = argparse.ArgumentParser(description='News Video Generator')
@@ -26,13 +143,13 @@ def main():
     print(f"=== NEWS VIDEO GENERATOR ===")
     print(f"Mode: {args.mode.upper()}")
     
-    # 1. Init Modules
-    fetcher = NewsFetcher()
-    script_gen = ScriptGenerator()
-    audio_gen = AudioGenerator()
-    visual_gen = VisualGenerator()
-    editor = VideoEditor()
-    dedup = DedupManager()
+    # 1. Init Modules needed to decide whether there is any work (in parallel -
+    #    constructors do disk I/O, so startup costs max() of them instead of sum())
+    with ThreadPoolExecutor(max_workers=2) as ex:
+        fetcher_future = ex.submit(NewsFetcher)
+        dedup_future = ex.submit(DedupManager)
+        fetcher = fetcher_future.result()
+        dedup = dedup_future.result()
 
     # 2. Fetch News based on mode
     print("--- 1. Fetching News ---")
@@ -55,9 +172,25 @@ def main():
          print("No valid news items.")
          return
     
-    # 3. COMBINED: Pick best article AND generate script in ONE Gemini call
-    print("--- 2. Picking Best Article & Generating Script (Combined) ---")
-    result = script_gen.pick_and_generate_script(selection_pool)
+    # 2c. Now that there is work, import + init the heavy media modules in the
+    #     background so they are ready by the time the script comes back.
+    prewarm = ThreadPoolExecutor(max_workers=3)
+    audio_future = prewarm.submit(_load_module, "audio_gen", "AudioGenerator")
+    visual_future = prewarm.submit(_load_module, "visual_gen", "VisualGenerator")
+    editor_future = prewarm.submit(_load_module, "video_editor", "VideoEditor")
+    prewarm.shutdown(wait=False)
+    script_gen = ScriptGenerator()
+
+    # 2d. Same pool as an earlier run -> reuse its pick + script, nothing to scrape
+    result = script_gen.cached_pick(selection_pool)
+    if not result:
+        # Scrape full article text for just the candidates Gemini will see
+        # (not every fetched entry); runs while the media modules load
+        fetcher.scrape_full_content(selection_pool)
+
+        # 3. COMBINED: Pick best article AND generate script in ONE Gemini call
+        print("--- 2. Picking Best Article & Generating Script (Combined) ---")
+        result = script_gen.pick_and_generate_script(selection_pool)
     
     if not result:
         print("Failed to pick article or generate script.")
@@ -67,6 +200,10 @@ def main():
     script_data = result["script"]
     
     print(f"Processing: {article.get('title')}")
+
+    audio_gen = audio_future.result()
+    visual_gen = visual_future.result()
+    editor = editor_future.result()
     
     # 4. Generate Content Per Segment (Synced)
     print("--- 4. Generating Synced Segments ---")
@@ -78,126 +215,20 @@ def main():
          print("Error: No segments found in script data.")
          return
 
-    final_segments = []
-
-    for idx, seg in enumerate(segments):
-        print(f"Processing Segment {idx+1}/{len(segments)}...")
-        
-        # 4a. Audio
-        audio_path = f"generated/segment_{article['article_id']}_{idx}.mp3"
-        script_text = seg.get("script", "")
-        
-        # COMPREHENSIVE AUDIO CLEANUP - SECOND LINE OF DEFENSE
-        import re
-        clean_text = script_text.strip()
-        
-        # STEP 0: DIRECT STRING REMOVALS (highest priority - exact matches)
-        for bad_pattern in ["Voice name =", "voice name =", "Voice Name =", "VOICE NAME =",
-                            "Speak voice name =", "speak voice name =", "Speak voice name=",
-                            "speek voice name =", "speek voice name=", "Voice =", "voice =", "VOICE =",
-                            "Name =", "name =", "NAME =", "Speak voice =", "speak voice =",
-                            "Voice = Inner Engineer", "Inner Engineer", "inner engineer", "ingenier", "inginer"]:
-            clean_text = clean_text.replace(bad_pattern, "")
-        
-        # Pattern 1: Remove "Voice:", "Narrator:", etc at START of any line (MULTILINE)
-        clean_text = re.sub(r'^(Voice|Narrator|Speaker|Audio|Voiceover|VO|Name)\s*[:=\-]?\s*', '', clean_text, flags=re.IGNORECASE | re.MULTILINE)
-        
-        # Pattern 2: Remove ANY word followed by = or : at the very start
-        clean_text = re.sub(r'^[A-Za-z]+\s*[:=]\s*', '', clean_text.strip())
-        
-        # Pattern 3: Remove emotion/direction tags like (Happy), [Excited], {Serious}
-        clean_text = re.sub(r'[\(\[\{](Happy|Sad|Excited|Serious|Urgent|Warm|Caution|Pause|Beat)[\)\]\}]', '', clean_text, flags=re.IGNORECASE)
-        
-        # Pattern 4: Remove inline "Voice:" ANYWHERE in text (global match)
-        clean_text = re.sub(r'\b(Voice|Narrator|Speaker|Audio|Name)\s*[:=]\s*', '', clean_text, flags=re.IGNORECASE)
-        
-        # Pattern 5: Remove [pause], [URGENT], etc.
-        clean_text = re.sub(r'\[(pause|urgent|beat|sfx|music)\]', '', clean_text, flags=re.IGNORECASE)
-        
-        # Pattern 6: Remove standalone "Voice", "Name", "Speak voice", "Speak voice name", typos
-        clean_text = re.sub(r'\b(Voice|Name)\b\s*', '', clean_text, flags=re.IGNORECASE)
-        clean_text = re.sub(r'\bInner\s*Engineer\b', '', clean_text, flags=re.IGNORECASE)
-        clean_text = re.sub(r'\b(ingenier|inginer)\b', '', clean_text, flags=re.IGNORECASE)
-        clean_text = re.sub(r'\bSpeak\s+voice\s+name\b', '', clean_text, flags=re.IGNORECASE)
-        clean_text = re.sub(r'\bSpeak\s+voice\b', '', clean_text, flags=re.IGNORECASE)
-        clean_text = re.sub(r'\bspeek\s+voice\s+name\b', '', clean_text, flags=re.IGNORECASE)
-        
-        # Clean up double spaces and trim
-        clean_text = re.sub(r'\s+', ' ', clean_text).strip()
-        
-        if not audio_gen.generate_audio(clean_text, audio_path):
-            print(f"Failed audio for segment {idx}")
-            continue
-        
-        # 4b. Visual
-        visual_text = seg.get("visual", "")
-        img_path = f"slide_{idx}.png"
-        
-        # Extract source name from article for credibility
-        source_url = article.get("source_url", "") or article.get("article_id", "")
-        source_name = "News"
-        if source_url:
-            # Extract domain name (e.g., "bbc.com" -> "BBC")
-            import urllib.parse
-            try:
-                domain = urllib.parse.urlparse(source_url).netloc
-                # Clean up domain: remove www., get main name
-                domain = domain.replace("www.", "").split(".")[0]
-                # Capitalize known sources
-                source_map = {
-                    "bbc": "BBC News", "cnn": "CNN", "ndtv": "NDTV",
-                    "timesofindia": "Times of India", "indianexpress": "Indian Express",
-                    "hindustantimes": "Hindustan Times", "thehindu": "The Hindu",
-                    "reuters": "Reuters", "aljazeera": "Al Jazeera",
-                    "theguardian": "The Guardian", "zeenews": "Zee News",
-                    "news18": "News18", "deccanherald": "Deccan Herald",
-                    "livemint": "Mint", "npr": "NPR", "skynews": "Sky News",
-                    "france24": "France24", "dw": "DW News", "abcnews": "ABC News"
-                }
-                source_name = source_map.get(domain.lower(), domain.capitalize())
-            except:
-                source_name = "Verified Source"
-        
-        full_img_path = visual_gen.generate_overlay(
-            headline=headline_text,
-            ticker_text=ticker_text,
-            summary_text=clean_text,
-            filename=img_path,
-            source_name=source_name
-        )
-        
-        # 4c. Ticker (One time generation or per segment? Let's do per segment to allow updates if needed, but usually static)
-        # For now, consistent ticker text
-        ticker_path_name = f"ticker_{idx}.png"
-        ticker_full_path = visual_gen.generate_ticker_image(ticker_text, ticker_path_name)
-
-        if full_img_path:
-            final_segments.append({
-                "audio": audio_path,
-                "image": full_img_path,
-                "ticker_image": ticker_full_path
-            })
+    # Segments + Background (Video or Image) are generated together
+    final_segments, bg_path, bg_type = asyncio.run(
+        _generate_assets(audio_gen, visual_gen, article, script_data, segments, headline_text, ticker_text)
+    )
             
     if not final_segments:
         print("Error: No valid segments generated.")
         sys.exit(1)
 
-    # Get Background (Video or Image)
-    bg_path, bg_type = visual_gen.get_background_video(article, script_data.get("video_search_keywords", []))
-    
     # 5. Assemble Video
     print("--- 5. Assembling Video ---")
     unique_ts = int(time.time())
     
-    # Sanitize Filename - Remove ALL invalid characters for Windows/Linux/Artifact upload
-    import re
-    safe_article_id = str(article['article_id'])
-    # Remove all invalid filename characters: ? * : " < > | / \ and also & = 
-    safe_article_id = re.sub(r'[?*:"<>|/\\&=\n\r]', '', safe_article_id)
-    # Replace remaining problematic chars
-    safe_article_id = safe_article_id.replace('.', '_').replace(' ', '_')
-    # Limit length to avoid path issues
-    safe_article_id = safe_article_id[:50]
+    safe_article_id = _safe_filename_part(article['article_id'])
     output_filename = f"news_{safe_article_id}_{unique_ts}.mp4"
     output_abs_path = os.path.join(os.getcwd(), "generated_videos", output_filename)
     # Ensure dir exists
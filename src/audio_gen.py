@@ -1,54 +1,351 @@
 import os
+import atexit
+import logging
 import requests
-import json
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import time
 import re
 import asyncio
+import threading
+import hashlib
+import shutil
+import subprocess
+import tempfile
+from functools import cache
+from contextlib import contextmanager
+
+# Per-text debug traces; enable with LOG_LEVEL=DEBUG (see main.py)
+logger = logging.getLogger(__name__)
+
+# Sentence boundaries for parallel Edge TTS synthesis
+_SENTENCE_SPLIT_RE = re.compile(r'(?<=[.!?])\s+')
+
+@cache
+def _ffmpeg_exe():
+    """ffmpeg binary: the one bundled with imageio-ffmpeg (moviepy dependency), else PATH."""
+    try:
+        import imageio_ffmpeg  # type: ignore
+        return imageio_ffmpeg.get_ffmpeg_exe()
+    except Exception:
+        return "ffmpeg"
+
+@cache
+def _gtts():
+    """Imports gTTS once."""
+    from gtts import gTTS
+    return gTTS
+
+def _build_automaton(patterns):
+    """Aho-Corasick automaton over patterns (None if pyahocorasick isn't installed)."""
+    try:
+        import ahocorasick  # type: ignore
+    except ImportError:
+        return None
+    automaton = ahocorasick.Automaton()
+    for pattern in patterns:
+        automaton.add_word(pattern, len(pattern))
+    automaton.make_automaton()
+    return automaton
 
 class AudioGenerator:
+    # EXACT patterns Gemini is generating - TTS must NEVER speak these
+    _EXACT_PATTERNS = (
+        # Multi-word patterns (MOST IMPORTANT)
+        "Voice name = Inner Engineer", "voice name = Inner Engineer",
+        "Voice name = inner engineer", "Voice Name = Inner Engineer",
+        "Voice name =", "voice name =", "Voice Name =", "voice Name =",
+        "Voice name=", "voice name=", "VOICE NAME =", "VOICE NAME=",
+        "Speak voice name =", "speak voice name =", "Speak voice name=", "speak voice name=",
+        "speek voice name =", "speek voice name=", "Speek voice name =",
+        "Speak voice =", "speak voice =", "Speak voice:", "Speak Voice =",
+        "Speak Voice:", "speak voice:", "Voice = Inner Engineer",
+        "voice = inner engineer", "Voice = inner engineer",
+        # Single word patterns
+        "Voice =", "voice =", "Voice=", "voice=", "Voice:", "voice:",
+        "Voice -", "voice -", "VOICE =", "VOICE:",
+        "Name =", "name =", "Name=", "name=", "Name:", "name:", "NAME =",
+        "Inner Engineer", "inner engineer", "INNER ENGINEER",
+        "ingenier", "inginer", "Ingenier",  # common TTS mishearing of "Engineer"
+        # Narrator/Speaker/Audio
+        "Narrator:", "narrator:", "Narrator =", "narrator =", "NARRATOR:",
+        "Speaker:", "speaker:", "Speaker =", "speaker =", "SPEAKER:",
+        "Audio:", "audio:", "Audio =", "audio =", "AUDIO:",
+        "VO:", "vo:", "VO =", "vo =",
+        "Voiceover:", "voiceover:", "Voiceover =", "voiceover =",
+    )
+    # One alternation instead of a replace() per pattern; longest first so
+    # "Voice name = Inner Engineer" wins over its "Voice name =" prefix
+    _RE_EXACT = re.compile("|".join(re.escape(p) for p in sorted(_EXACT_PATTERNS, key=len, reverse=True)))
+    # Same job as one linear Aho-Corasick scan when pyahocorasick is available
+    _EXACT_AUTOMATON = _build_automaton(_EXACT_PATTERNS)
+    # Up to 5 words before = or : at start ("Word1 Word2 Word3 = ...")
+    _RE_LEADING_LABEL = re.compile(r'^([A-Za-z]+\s+){0,5}[A-Za-z]+\s*[:=]\s*')
+    # Labels anywhere in text + standalone "Voice", "Name", "Speak voice", typos.
+    # Multi-word alternatives come first so "Speak voice name" goes as a whole.
+    _RE_VOICE_LABEL = re.compile(
+        r'\b(?:'
+        r'(?:Speak|speek)\s+voice\s+name\s*[:=]?\s*'
+        r'|Speak\s+voice\b'
+        r'|(?:Voice|Narrator|Speaker|Audio|VO|Voiceover|Name|Inner\s+Engineer)\s*[:=\-]?\s*'
+        r'|Inner\s*Engineer\b'
+        r'|(?:ingenier|inginer)\b'
+        r')',
+        re.IGNORECASE,
+    )
+    _RE_DIRECTION_TAG = re.compile(r'[\(\[\{][^\)\]\}]{0,30}[\)\]\}]')
+    _RE_LEADING_SEPARATORS = re.compile(r'^[\s:=\-]+')
+    _RE_WHITESPACE = re.compile(r'\s+')
+    # SSML/XML escaping in one translate() pass instead of 5 chained replace() calls
+    _XML_ESCAPE = str.maketrans({"&": "&amp;", "<": "&lt;", ">": "&gt;", '"': "&quot;", "'": "&apos;"})
+
     def __init__(self):
         # 100% free path: prefer Edge Neural TTS (no API key).
         # Paid path (optional): ElevenLabs if key provided.
         self.elevenlabs_api_key = os.getenv("ELEVENLABS_API_KEY") or os.getenv("TTS_API_KEY")
         self.eleven_voice_id = "nPczCjz86I70pA5ccg71"
+        # Override with ELEVENLABS_MODEL_ID (e.g. eleven_turbo_v2); default is the original voice model
+        self.eleven_model_id = os.getenv("ELEVENLABS_MODEL_ID", "eleven_monolingual_v1")
+        # Silence inserted between segments in a batched request (split point)
+        self.batch_break_s = 1.5
+
+        # Pooled keep-alive session: segments reuse one TCP+TLS connection
+        # to api.elevenlabs.io instead of handshaking on every call.
+        self.session = requests.Session()
+        self.session.headers.update({"Accept": "audio/mpeg", "Content-Type": "application/json"})
+        if self.elevenlabs_api_key:
+            self.session.headers.update({"xi-api-key": self.elevenlabs_api_key})
+        retries = Retry(
+            total=3,
+            backoff_factor=0.3,
+            status_forcelist=[429, 500, 502, 503, 504],
+            allowed_methods=frozenset(["POST"]),
+        )
+        self.session.mount("https://", HTTPAdapter(pool_connections=8, pool_maxsize=8, max_retries=retries))
+
+        # One long-lived event loop for edge-tts instead of asyncio.run() per clip
+        # (no loop setup/teardown per call, edge-tts connections stay warm).
+        self._loop = self._new_event_loop()
+        self._loop_thread = threading.Thread(target=self._loop.run_forever, name="tts-loop", daemon=True)
+        self._loop_thread.start()
+        atexit.register(self.close)
+        # Caps open Edge websockets: shared by every sentence of every segment on that loop
+        self._edge_semaphore = asyncio.Semaphore(4)
+
+        # Pre-open the pooled connection (DNS + TCP + TLS) in the background so
+        # the first real TTS request doesn't pay the handshake.
+        if self.elevenlabs_api_key:
+            threading.Thread(target=self._warm_connection, name="tts-warmup", daemon=True).start()
 
         # Free, natural-ish voices (no key). Pick one default.
         # You can change this later for style.
         self.edge_voice = os.getenv("EDGE_TTS_VOICE", "en-IN-NeerjaNeural")
 
+        # Local, offline fallback (optional): path to a Piper .onnx voice,
+        # e.g. en_US-amy-medium.onnx. Loaded once here, reused for every segment.
+        self.piper_voice = self._load_piper_voice(os.getenv("PIPER_MODEL"))
+
+        # Content-addressed TTS cache: same text + voice -> same audio bytes.
+        # Kept outside generated/ because VisualGenerator wipes that dir on init.
+        self.cache_dir = os.path.join(".cache", "tts")
+        self.cache_ttl_days = 7
+        self.cache_max_mb = 200
+
+        # Create output + cache dirs ONCE here instead of a stat+mkdir per segment write
+        self.output_dir = "generated"
+        os.makedirs(self.output_dir, exist_ok=True)
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def close(self):
+        """Releases pooled connections + stops the TTS event loop (also registered with atexit)."""
+        self.session.close()
+        if self._loop.is_running():
+            self._loop.call_soon_threadsafe(self._loop.stop)
+
+    def _warm_connection(self):
+        """Cheap HEAD to api.elevenlabs.io; the keep-alive socket stays in the pool."""
+        try:
+            self.session.head("https://api.elevenlabs.io/v1/voices", timeout=3)
+        except Exception:
+            pass  # Warm-up only - the real request will connect on its own
+
+    @staticmethod
+    def _new_event_loop():
+        """uvloop (libuv) when installed - faster websocket I/O for edge-tts - else asyncio's."""
+        try:
+            import uvloop  # type: ignore
+            return uvloop.new_event_loop()
+        except ImportError:
+            return asyncio.new_event_loop()
+
+    def _run_async(self, coro, timeout=60):
+        """
+        Runs a coroutine on the persistent TTS loop and waits for its result.
+        The timeout is applied on the loop (wait_for), so by the time TimeoutError
+        reaches the caller the coroutine is cancelled and can no longer replace an
+        output file the caller falls back to writing.
+        """
+        future = asyncio.run_coroutine_threadsafe(asyncio.wait_for(coro, timeout), self._loop)
+        try:
+            # Grace period: wait_for itself normally ends first
+            return future.result(timeout=timeout + 10)
+        except TimeoutError:
+            future.cancel()
+            raise
+
+    def _part_path(self, output_path):
+        """Temp path next to output_path (same dir -> os.replace is atomic)."""
+        return f"{output_path}.{os.getpid()}.{threading.get_ident()}.part"
+
+    @contextmanager
+    def _atomic_output(self, output_path):
+        """
+        Yields a temp path to write to; renamed onto output_path only on success.
+        Readers never see a truncated clip, and an output_path that is a hardlink
+        into the TTS cache is replaced instead of overwritten in place.
+        """
+        tmp_path = self._part_path(output_path)
+        try:
+            yield tmp_path
+            os.replace(tmp_path, output_path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
     def generate_audio(self, text, output_path="generated/audio.mp3"):
         """
         Generates audio.
         Priority:
         1) Edge Neural TTS (FREE, no key) -> most human-like
         2) ElevenLabs (if key provided)
-        3) gTTS fallback (FREE, but more robotic)
+        3) Local fallback: Piper (FREE, offline, if PIPER_MODEL set) -> gTTS (FREE, but more robotic)
         """
-        # DEBUG: Show what we received
-        print(f"[TTS DEBUG] ORIGINAL INPUT: {text}")
-        
-        # FINAL CHECKPOINT: Clean ALL metadata before TTS
-        text = self._sanitize_for_tts(text)
-        
-        # DEBUG: Show what we're sending to TTS
-        print(f"[TTS DEBUG] CLEANED OUTPUT: {text}")
-        
-        if not text.strip():
-            print("ERROR: Text is empty after sanitization!")
-            return None
-        
-        # 1) Free, human-like (no key)
-        edge_path = self._generate_edge_tts_audio(text, output_path)
-        if edge_path:
-            return edge_path
+        return self.generate_audio_batch([text], [output_path])[0]
 
-        # 2) Paid (optional)
-        if self.elevenlabs_api_key:
-            return self._generate_elevenlabs_audio(text, output_path)
+    def generate_audio_batch(self, texts, output_paths):
+        """
+        Generates audio for several segments at once (same priority as generate_audio).
+        Edge TTS runs the segments concurrently; whatever is left for ElevenLabs is
+        synthesized in ONE request and split back into segments at the pauses.
+        Returns a list of paths in input order (None where generation failed).
+        """
+        results = [None] * len(texts)
+        pending = []  # (index, clean_text, output_path, cache_path)
 
-        # 3) Free fallback
-        print("Using Free TTS fallback (gTTS)...")
-        return self._generate_gtts_audio(text, output_path)
+        for idx, (text, output_path) in enumerate(zip(texts, output_paths)):
+            # DEBUG: Show what we received
+            logger.debug("[TTS DEBUG] ORIGINAL INPUT: %s", text)
+
+            # FINAL CHECKPOINT: Clean ALL metadata before TTS
+            text = self._sanitize_for_tts(text)
+
+            # DEBUG: Show what we're sending to TTS
+            logger.debug("[TTS DEBUG] CLEANED OUTPUT: %s", text)
+
+            if not text.strip():
+                print("ERROR: Text is empty after sanitization!")
+                continue
+
+            # 0) Cache hit -> skip TTS entirely
+            cache_path = self._cache_path(text)
+            if self._load_from_cache(cache_path, output_path):
+                print(f"[TTS Cache] Hit: {os.path.basename(cache_path)}")
+                results[idx] = output_path
+                continue
+            pending.append((idx, text, output_path, cache_path))
+
+        synthesized = list(pending)
+
+        # 1) Free, human-like (no key) - segments in parallel
+        if pending:
+            try:
+                edge_paths = self._run_async(
+                    self._edge_batch([(p[1], p[2]) for p in pending]), timeout=60 * len(pending)
+                )
+            except Exception as e:
+                print(f"Edge TTS batch failed: {e}")
+                edge_paths = [None] * len(pending)
+            for item, path in zip(pending, edge_paths):
+                results[item[0]] = path
+            pending = [item for item, path in zip(pending, edge_paths) if not path]
+
+        # 2) Paid (optional) - one batched request for all remaining segments
+        if pending and self.elevenlabs_api_key:
+            if len(pending) > 1 and self._generate_elevenlabs_batch([p[1] for p in pending], [p[2] for p in pending]):
+                for item in pending:
+                    results[item[0]] = item[2]
+                pending = []
+            else:
+                for item in pending:
+                    results[item[0]] = self._generate_elevenlabs_audio(item[1], item[2])
+                pending = [item for item in pending if not results[item[0]]]
+
+        # 3) Free fallback - never cached: an Edge/ElevenLabs outage must not pin
+        #    the robotic clip as the "hit" for this text for the next runs
+        fallback = {item[0] for item in pending}
+        for item in pending:
+            results[item[0]] = self._generate_free_audio(item[1], item[2])
+
+        for idx, _, _, cache_path in synthesized:
+            if results[idx] and idx not in fallback:
+                self._save_to_cache(results[idx], cache_path)
+        return results
+
+    def _cache_path(self, text):
+        """
+        Cache file for this text, keyed on every voice that could have spoken it.
+        Only Edge/ElevenLabs clips are stored, so a hit is never a Piper/gTTS fallback.
+        """
+        key = hashlib.blake2b(f"{self.edge_voice}|{self.eleven_voice_id}|{text}".encode("utf-8"), digest_size=16).hexdigest()
+        return os.path.join(self.cache_dir, f"{key}.mp3")
+
+    def _link_or_copy(self, src, dst):
+        """Hardlinks src -> dst (no data copied); falls back to a copy across filesystems."""
+        if os.path.exists(dst):
+            os.remove(dst)
+        try:
+            os.link(src, dst)
+        except OSError:
+            shutil.copyfile(src, dst)
+
+    def _load_from_cache(self, cache_path, output_path):
+        """Links a fresh cached clip to output_path. Returns True on hit."""
+        try:
+            if not os.path.exists(cache_path):
+                return False
+            # Too small = truncated/failed write; expired = not used for cache_ttl_days
+            if (os.path.getsize(cache_path) <= 1000 or
+                    time.time() - os.path.getmtime(cache_path) > self.cache_ttl_days * 24 * 60 * 60):
+                os.remove(cache_path)
+                return False
+            self._link_or_copy(cache_path, output_path)
+            os.utime(cache_path)  # mtime = last use, drives TTL + LRU eviction
+            return True
+        except Exception as e:
+            print(f"[TTS Cache] Read failed: {e}")
+            return False
+
+    def _save_to_cache(self, audio_path, cache_path):
+        try:
+            self._link_or_copy(audio_path, cache_path)
+            self._evict_cache()
+        except Exception as e:
+            print(f"[TTS Cache] Write failed: {e}")
+
+    def _evict_cache(self):
+        """LRU eviction: drop least recently used clips until the cache fits cache_max_mb."""
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            path = os.path.join(self.cache_dir, name)
+            st = os.stat(path)
+            entries.append((st.st_mtime, st.st_size, path))
+        total = sum(size for _, size, _ in entries)
+        limit = self.cache_max_mb * 1024 * 1024
+        for _, size, path in sorted(entries):
+            if total <= limit:
+                break
+            os.remove(path)
+            total -= size
 
     def _sanitize_for_tts(self, text):
         """
@@ -63,68 +360,41 @@ class AudioGenerator:
         original = clean  # Keep for debug
         
         # STEP 0: DIRECT STRING REPLACEMENTS (exact patterns - case sensitive)
-        # These are the EXACT patterns Gemini is generating
-        exact_patterns = [
-            # Multi-word patterns (MOST IMPORTANT) - TTS must NEVER speak these
-            "Voice name = Inner Engineer", "voice name = Inner Engineer",
-            "Voice name = inner engineer", "Voice Name = Inner Engineer",
-            "Voice name =", "voice name =", "Voice Name =", "voice Name =",
-            "Voice name=", "voice name=", "VOICE NAME =", "VOICE NAME=",
-            "Speak voice name =", "speak voice name =", "Speak voice name=", "speak voice name=",
-            "speek voice name =", "speek voice name=", "Speek voice name =",
-            "Speak voice =", "speak voice =", "Speak voice:", "Speak Voice =",
-            "Speak Voice:", "speak voice:", "Voice = Inner Engineer",
-            "voice = inner engineer", "Voice = inner engineer",
-            # Single word patterns
-            "Voice =", "voice =", "Voice=", "voice=", "Voice:", "voice:", 
-            "Voice -", "voice -", "VOICE =", "VOICE:",
-            "Name =", "name =", "Name=", "name=", "Name:", "name:", "NAME =",
-            "Inner Engineer", "inner engineer", "INNER ENGINEER",
-            "ingenier", "inginer", "Ingenier",  # common TTS mishearing of "Engineer"
-            # Narrator/Speaker/Audio
-            "Narrator:", "narrator:", "Narrator =", "narrator =", "NARRATOR:",
-            "Speaker:", "speaker:", "Speaker =", "speaker =", "SPEAKER:",
-            "Audio:", "audio:", "Audio =", "audio =", "AUDIO:",
-            "VO:", "vo:", "VO =", "vo =",
-            "Voiceover:", "voiceover:", "Voiceover =", "voiceover =",
-        ]
-        for pattern in exact_patterns:
-            clean = clean.replace(pattern, "")
+        clean = self._strip_exact_patterns(clean)
         
         # STEP 1: AGGRESSIVE REGEX - Remove ANY words before = or : at start
-        # This matches: "Word1 Word2 Word3 = ..." or "Word1 Word2:"
-        # Catches up to 5 words before the separator
-        clean = re.sub(r'^([A-Za-z]+\s+){0,5}[A-Za-z]+\s*[:=]\s*', '', clean.strip())
+        clean = self._RE_LEADING_LABEL.sub('', clean.strip())
         
-        # STEP 2: Remove ANYWHERE in text (not just start)
-        clean = re.sub(r'\b(Voice|Narrator|Speaker|Audio|VO|Voiceover|Name|Inner\s+Engineer)\s*[:=\-]?\s*', '', clean, flags=re.IGNORECASE)
-        clean = re.sub(r'\bSpeak\s+voice\s+name\s*[:=]?\s*', '', clean, flags=re.IGNORECASE)
-        clean = re.sub(r'\bspeek\s+voice\s+name\s*[:=]?\s*', '', clean, flags=re.IGNORECASE)
-        
-        # STEP 3: Remove standalone "Voice", "Name", "Speak voice", "Speak voice name", typos
-        clean = re.sub(r'\bVoice\b', '', clean, flags=re.IGNORECASE)
-        clean = re.sub(r'\bName\b', '', clean, flags=re.IGNORECASE)
-        clean = re.sub(r'\bInner\s*Engineer\b', '', clean, flags=re.IGNORECASE)
-        clean = re.sub(r'\b(ingenier|inginer)\b', '', clean, flags=re.IGNORECASE)
-        clean = re.sub(r'\bSpeak\s+voice\s+name\b', '', clean, flags=re.IGNORECASE)
-        clean = re.sub(r'\bSpeak\s+voice\b', '', clean, flags=re.IGNORECASE)
-        clean = re.sub(r'\bspeek\s+voice\s+name\b', '', clean, flags=re.IGNORECASE)
+        # STEP 2+3: Remove labels ANYWHERE in text + standalone words/typos (one pass)
+        clean = self._RE_VOICE_LABEL.sub('', clean)
         
         # STEP 4: Remove emotion/direction tags
-        clean = re.sub(r'[\(\[\{][^\)\]\}]{0,30}[\)\]\}]', '', clean)
+        clean = self._RE_DIRECTION_TAG.sub('', clean)
         
         # STEP 5: Remove any = or : at the very start (leftover separators)
-        clean = re.sub(r'^[\s:=\-]+', '', clean)
+        clean = self._RE_LEADING_SEPARATORS.sub('', clean)
         
         # STEP 6: Normalize whitespace
-        clean = re.sub(r'\s+', ' ', clean).strip()
+        clean = self._RE_WHITESPACE.sub(' ', clean).strip()
         
         # Debug output
-        print(f"[TTS SANITIZER] BEFORE: '{original[:100]}'")
-        print(f"[TTS SANITIZER] AFTER:  '{clean[:100]}'")
+        logger.debug("[TTS SANITIZER] BEFORE: '%.100s'", original)
+        logger.debug("[TTS SANITIZER] AFTER:  '%.100s'", clean)
         
         return clean
 
+    def _strip_exact_patterns(self, text):
+        """Removes every _EXACT_PATTERNS occurrence in a single pass over text."""
+        if self._EXACT_AUTOMATON is None:
+            return self._RE_EXACT.sub("", text)
+        # iter_long yields non-overlapping leftmost-longest matches as (end_index, length)
+        kept, pos = [], 0
+        for end, length in self._EXACT_AUTOMATON.iter_long(text):
+            kept.append(text[pos:end - length + 1])
+            pos = end + 1
+        kept.append(text[pos:])
+        return "".join(kept)
+
     def _to_ssml(self, text: str) -> str:
         """
         Convert our script markers into SSML for better pacing.
@@ -133,16 +403,6 @@ class AudioGenerator:
         receives the voice via the Communicate constructor. Including the 
         voice tag in SSML can cause "voice name =" to be spoken aloud.
         """
-        # Basic escaping for SSML XML
-        def esc(s: str) -> str:
-            return (
-                s.replace("&", "&amp;")
-                .replace("<", "&lt;")
-                .replace(">", "&gt;")
-                .replace('"', "&quot;")
-                .replace("'", "&apos;")
-            )
-
         # Normalize pauses
         # - [pause] -> 450ms break
         # - multiple dots / ellipsis -> small break
@@ -151,10 +411,25 @@ class AudioGenerator:
         normalized = re.sub(r"\.\.\.+", " <break time=\"250ms\"/> ", normalized)
 
         # Keep it simple - no voice wrapper (edge-tts handles voice selection)
-        body = esc(normalized)
+        body = normalized.translate(self._XML_ESCAPE)
         return f"<speak>{body}</speak>"
 
     def _generate_edge_tts_audio(self, text, output_path):
+        """Sync entry point: runs _edge_async on the persistent TTS loop."""
+        try:
+            return self._run_async(self._edge_async(text, output_path))
+        except Exception as e:
+            print(f"Edge TTS failed: {e}")
+            return None
+
+    async def _edge_batch(self, jobs):
+        """
+        Synthesizes (text, output_path) jobs concurrently with edge-tts.
+        Open websockets are bounded per sentence by _edge_semaphore. Results keep job order.
+        """
+        return await asyncio.gather(*[self._edge_async(text, path) for text, path in jobs])
+
+    async def _edge_async(self, text, output_path):
         """
         Uses edge-tts (FREE, no key). Requires internet access.
         NOTE: We pass PLAIN TEXT directly - NO SSML wrapper tags.
@@ -163,8 +438,6 @@ class AudioGenerator:
         try:
             import edge_tts  # type: ignore
 
-            os.makedirs(os.path.dirname(output_path), exist_ok=True)
-            
             # DO NOT use _to_ssml() - pass plain text directly
             # SSML tags like <speak> can be spoken aloud by edge-tts
             plain_text = text.strip()
@@ -172,74 +445,231 @@ class AudioGenerator:
             # Handle pauses by converting to natural punctuation
             plain_text = plain_text.replace("[pause]", "...")
             
-            async def _run():
-                # Pass plain text, NOT SSML - voice is handled by the parameter
-                communicate = edge_tts.Communicate(plain_text, voice=self.edge_voice)
-                await communicate.save(output_path)
+            # Sentences are synthesized concurrently (network-bound), then joined.
+            sentences = [s for s in _SENTENCE_SPLIT_RE.split(plain_text) if s.strip()]
 
-            print(f"Using FREE Edge Neural TTS voice: {self.edge_voice}")
-            asyncio.run(_run())
+            print(f"Using FREE Edge Neural TTS voice: {self.edge_voice} ({len(sentences)} sentences in parallel)")
+            # gather keeps sentence order
+            parts = await asyncio.gather(*[self._edge_synthesize(edge_tts, s) for s in sentences])
 
-            if os.path.exists(output_path) and os.path.getsize(output_path) > 1000:
-                return output_path
-            print("Edge TTS produced empty audio; falling back...")
-            return None
+            if sum(len(p) for p in parts) <= 1000:
+                print("Edge TTS produced empty audio; falling back...")
+                return None
+            with self._atomic_output(output_path) as tmp_path:
+                await self._join_mp3_parts(parts, tmp_path)
+            return output_path
         except Exception as e:
             print(f"Edge TTS failed: {e}")
             return None
 
-    def _generate_elevenlabs_audio(self, text, output_path):
-        url = f"https://api.elevenlabs.io/v1/text-to-speech/{self.eleven_voice_id}"
-        headers = {
-            "Accept": "audio/mpeg",
-            "Content-Type": "application/json",
-            "xi-api-key": self.elevenlabs_api_key
+    async def _join_mp3_parts(self, parts, output_path):
+        """
+        Joins per-sentence MP3s with ffmpeg's concat demuxer (-c copy: frames are
+        stream-copied, never re-encoded) so the result gets clean timestamps.
+        Falls back to a plain byte-concat, which is still valid MP3.
+        """
+        if len(parts) > 1:
+            try:
+                out_dir = os.path.dirname(os.path.abspath(output_path))
+                with tempfile.TemporaryDirectory(dir=out_dir) as tmp_dir:
+                    list_path = os.path.join(tmp_dir, "concat.txt")
+                    with open(list_path, "w", encoding="utf-8") as f:
+                        for i, part in enumerate(parts):
+                            chunk_path = os.path.join(tmp_dir, f"chunk_{i}.mp3")
+                            with open(chunk_path, "wb") as chunk_file:
+                                chunk_file.write(part)
+                            f.write("file '{}'\n".format(chunk_path.replace("'", "'\\''")))
+                    proc = await asyncio.create_subprocess_exec(
+                        _ffmpeg_exe(), "-y", "-loglevel", "error",
+                        "-f", "concat", "-safe", "0", "-i", list_path,
+                        "-c", "copy", "-f", "mp3", output_path,
+                        stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+                    )
+                    try:
+                        _, err = await proc.communicate()
+                    except asyncio.CancelledError:
+                        proc.kill()  # Timed out (see _run_async): don't leave ffmpeg writing
+                        raise
+                if proc.returncode == 0:
+                    return
+                print(f"[Concat] ffmpeg failed: {err.decode(errors='ignore').strip()}")
+            except Exception as e:
+                print(f"[Concat] ffmpeg unavailable: {e}")
+        # MP3 frames are self-synchronizing, so byte-concat gives a valid file
+        with open(output_path, "wb") as f:
+            f.write(b"".join(parts))
+
+    async def _edge_synthesize(self, edge_tts, sentence):
+        """Synthesizes one sentence with edge-tts and returns the MP3 bytes."""
+        # Pass plain text, NOT SSML - voice is handled by the parameter
+        async with self._edge_semaphore:
+            communicate = edge_tts.Communicate(sentence, voice=self.edge_voice)
+            audio = bytearray()
+            async for chunk in communicate.stream():
+                if chunk["type"] == "audio":
+                    audio += chunk["data"]
+        return bytes(audio)
+
+    def _elevenlabs_request(self, text):
+        """
+        POSTs to the ElevenLabs /stream endpoint so the clip is written to disk as it
+        arrives instead of being buffered whole. Full-quality MP3 and no
+        optimize_streaming_latency: higher levels skip text normalization (numbers,
+        dates), and this offline pipeline waits for the whole file anyway.
+        """
+        url = f"https://api.elevenlabs.io/v1/text-to-speech/{self.eleven_voice_id}/stream"
+        params = {
+            "output_format": "mp3_44100_128"
         }
         data = {
             "text": text,
-            "model_id": "eleven_monolingual_v1",
+            "model_id": self.eleven_model_id,
             "voice_settings": {
                 "stability": 0.5,
                 "similarity_boost": 0.75
             }
         }
+        response = self.session.post(url, params=params, json=data, stream=True)
+        response.raise_for_status()
+        return response
+
+    def _generate_elevenlabs_audio(self, text, output_path):
         try:
             print(f"Generating ElevenLabs audio...")
-            response = requests.post(url, json=data, headers=headers)
-            response.raise_for_status()
-            os.makedirs(os.path.dirname(output_path), exist_ok=True)
-            with open(output_path, 'wb') as f:
-                f.write(response.content)
+            with self._elevenlabs_request(text) as response:
+                self._stream_to_file(response, output_path)
             return output_path
         except Exception as e:
             print(f"ElevenLabs failed: {e}. Falling back to free.")
-            return self._generate_gtts_audio(text, output_path)
+            return None
+
+    def _stream_to_file(self, response, output_path):
+        """Writes a streamed response to disk chunk by chunk (constant memory)."""
+        with self._atomic_output(output_path) as tmp_path:
+            with open(tmp_path, 'wb') as f:
+                for chunk in response.iter_content(chunk_size=65536):
+                    if chunk:  # skip keep-alive chunks
+                        f.write(chunk)
+
+    def _generate_elevenlabs_batch(self, texts, output_paths):
+        """
+        Synthesizes all segments in ONE ElevenLabs request: segments are joined with
+        long <break> tags, then the returned MP3 is split at those silences.
+        Returns True only if every segment was written; False means the caller
+        should fall back to one request per segment.
+        """
+        try:
+            from pydub import AudioSegment
+            from pydub.silence import split_on_silence
+        except ImportError:
+            return False
+
+        # Break must be clearly longer than any natural pause inside a sentence
+        joined = f' <break time="{self.batch_break_s}s" /> '.join(texts)
+        try:
+            print(f"Generating ElevenLabs audio for {len(texts)} segments in one request...")
+            # Stream the combined clip to disk rather than buffering it in memory
+            batch_path = os.path.splitext(output_paths[0])[0] + ".batch.mp3"
+            with self._elevenlabs_request(joined) as response:
+                self._stream_to_file(response, batch_path)
+            audio = AudioSegment.from_file(batch_path, format="mp3")
+            os.remove(batch_path)
+
+            chunks = split_on_silence(
+                audio,
+                min_silence_len=int(self.batch_break_s * 1000 * 0.7),
+                silence_thresh=-40,
+                keep_silence=150
+            )
+            if len(chunks) != len(texts):
+                print(f"ElevenLabs batch split into {len(chunks)} parts, expected {len(texts)}. Falling back per segment.")
+                return False
+
+            for chunk, output_path in zip(chunks, output_paths):
+                with self._atomic_output(output_path) as tmp_path:
+                    chunk.export(tmp_path, format="mp3")
+            return True
+        except Exception as e:
+            print(f"ElevenLabs batch failed: {e}. Falling back per segment.")
+            return False
+
+    def _generate_free_audio(self, text, output_path):
+        """
+        Free fallback chain: local Piper first (no network, no rate limits), then gTTS.
+        """
+        if self.piper_voice:
+            piper_path = self._generate_piper_audio(text, output_path)
+            if piper_path:
+                return piper_path
+        print("Using Free TTS fallback (gTTS)...")
+        return self._generate_gtts_audio(text, output_path)
+
+    def _load_piper_voice(self, model_path):
+        """Loads the Piper ONNX voice once (None if not configured/installed)."""
+        if not model_path:
+            return None
+        try:
+            from piper import PiperVoice  # type: ignore
+            voice = PiperVoice.load(model_path)
+            print(f"Loaded local Piper voice: {model_path}")
+            return voice
+        except Exception as e:
+            print(f"Piper TTS unavailable: {e}")
+            return None
+
+    def _generate_piper_audio(self, text, output_path):
+        """
+        Uses Piper (FREE, runs locally on CPU via onnxruntime).
+        Synthesizes to WAV, then converts to MP3 to match the other backends.
+        """
+        try:
+            import wave
+            from pydub import AudioSegment
+
+            wav_path = os.path.splitext(output_path)[0] + ".piper.wav"
+            with wave.open(wav_path, "wb") as wav_file:
+                # piper-tts >= 1.3 renamed the WAV writer to synthesize_wav
+                synthesize = getattr(self.piper_voice, "synthesize_wav", None) or self.piper_voice.synthesize
+                synthesize(text, wav_file)
+
+            print("Using local Piper TTS...")
+            with self._atomic_output(output_path) as tmp_path:
+                AudioSegment.from_wav(wav_path).export(tmp_path, format="mp3")
+            os.remove(wav_path)
+            return output_path
+        except Exception as e:
+            print(f"Piper TTS failed: {e}")
+            return None
 
     def _generate_gtts_audio(self, text, output_path):
         """
         Uses gTTS (Google Text-to-Speech) - Completely Free.
         """
         try:
-            from gtts import gTTS
-            
-            # Ensure directory exists
-            os.makedirs(os.path.dirname(output_path), exist_ok=True)
+            gTTS = _gtts()
             
             # Indian Accent English (co.in)
             tts = gTTS(text=text, lang='en', tld='co.in') 
-            tts.save(output_path)
+            with self._atomic_output(output_path) as tmp_path:
+                tts.save(tmp_path)
             return output_path
         except Exception as e:
             print(f"gTTS fallback failed: {e}")
             return None
 
     def get_audio_duration(self, audio_path):
+        """Reads the duration from the file headers - nothing is decoded."""
         try:
-            from moviepy.editor import AudioFileClip
-            clip = AudioFileClip(audio_path)
-            duration = clip.duration
-            clip.close()
-            return duration
+            from mutagen import File as MutagenFile  # type: ignore
+            return MutagenFile(audio_path).info.length
+        except Exception:
+            pass  # mutagen missing / unknown format -> ffprobe below
+        try:
+            out = subprocess.check_output([
+                "ffprobe", "-v", "error", "-show_entries", "format=duration",
+                "-of", "default=nw=1:nk=1", audio_path,
+            ])
+            return float(out)
         except Exception as e:
             print(f"Error getting duration: {e}")
             return 0
@@ -259,8 +689,6 @@ class AudioGenerator:
             Path to the mixed audio file
         """
         try:
-            from moviepy.editor import AudioFileClip, CompositeAudioClip
-            
             if not output_path:
                 output_path = voice_path  # Replace in place
             
@@ -270,33 +698,23 @@ class AudioGenerator:
             
             print(f"[Mix] Mixing voice with background music (volume: {music_volume})...")
             
-            # Load voice
-            voice = AudioFileClip(voice_path)
-            voice_duration = voice.duration
-            
-            # Load and adjust music
-            music = AudioFileClip(music_path)
-            
-            # Loop music if shorter than voice
-            if music.duration < voice_duration:
-                from moviepy.audio.fx.all import audio_loop
-                music = audio_loop(music, duration=voice_duration)
-            else:
-                music = music.subclip(0, voice_duration)
-            
-            # Lower music volume
-            music = music.volumex(music_volume)
-            
-            # Composite (voice on top)
-            final = CompositeAudioClip([music, voice])
-            
-            # Write
-            final.write_audiofile(output_path, fps=44100, verbose=False, logger=None)
-            
-            # Cleanup
-            voice.close()
-            music.close()
-            final.close()
+            # One native ffmpeg pass: music looped forever (-stream_loop -1) and cut
+            # to the voice length (duration=first), lowered, then summed with the
+            # voice on top (normalize=0 keeps the voice at full volume).
+            # Write to a temp file + rename: never rewrite output_path in place,
+            # it may be a hardlink into the TTS cache
+            base, ext = os.path.splitext(output_path)
+            tmp_path = f"{base}.mixing{ext}"
+            subprocess.run([
+                _ffmpeg_exe(), "-y", "-loglevel", "error",
+                "-i", voice_path,
+                "-stream_loop", "-1", "-i", music_path,
+                "-filter_complex",
+                f"[1:a]volume={music_volume}[m];[0:a][m]amix=inputs=2:duration=first:dropout_transition=0:normalize=0[out]",
+                "-map", "[out]", "-ar", "44100", "-b:a", "192k",
+                tmp_path,
+            ], check=True, capture_output=True)
+            os.replace(tmp_path, output_path)
             
             print(f"[Mix] Mixed audio saved: {output_path}")
             return output_path
@@ -0,0 +1,95 @@
+"""
+Bloom Filter - Compact "have we seen this article before?" set.
+Fixed-size bit array: O(1) add/lookup, ~10 bits per item at 0.1% false positives.
+A false positive only means an article is skipped, which is fine for news dedup.
+"""
+import os
+import math
+import struct
+import hashlib
+
+_MAGIC = b"BLM1"
+_HEADER = struct.Struct("<4sQII")  # magic, num_bits, num_hashes, count
+
+
+class BloomFilter:
+    def __init__(self, capacity=100000, error_rate=0.001):
+        # Standard sizing: m = -n*ln(p) / ln(2)^2, k = m/n * ln(2)
+        self.num_bits = max(8, int(math.ceil(-capacity * math.log(error_rate) / (math.log(2) ** 2))))
+        self.num_hashes = max(1, int(round(self.num_bits / capacity * math.log(2))))
+        self.bits = bytearray((self.num_bits + 7) // 8)
+        self.count = 0
+
+    def _positions(self, item):
+        # Double hashing (Kirsch-Mitzenmacher): k positions from one 128-bit digest.
+        # Generator: a lookup miss (the common case) stops at the first unset bit.
+        digest = hashlib.blake2b(str(item).encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        num_bits = self.num_bits
+        return ((h1 + i * h2) % num_bits for i in range(self.num_hashes))
+
+    def add(self, item):
+        """Adds an item. Returns True if it was (probably) new."""
+        is_new = False
+        for pos in self._positions(item):
+            byte, bit = divmod(pos, 8)
+            if not self.bits[byte] & (1 << bit):
+                self.bits[byte] |= 1 << bit
+                is_new = True
+        if is_new:
+            self.count += 1
+        return is_new
+
+    def __contains__(self, item):
+        for pos in self._positions(item):
+            byte, bit = divmod(pos, 8)
+            if not self.bits[byte] & (1 << bit):
+                return False
+        return True
+
+    def __len__(self):
+        return self.count
+
+    @property
+    def capacity(self):
+        """Item count the filter was sized for (k = m/n * ln(2) solved for n)."""
+        return int(self.num_bits * math.log(2) / self.num_hashes)
+
+    def is_saturated(self):
+        """True once past design capacity - the false-positive rate climbs from here."""
+        return self.count >= self.capacity
+
+    def save(self, path):
+        """
+        Writes header + bit array atomically (tmp file + rename). The tmp file is
+        fsync'd before the rename so a crash can't leave a renamed-but-empty file;
+        callers batch adds and save once, so this is one fsync per batch.
+        """
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(_HEADER.pack(_MAGIC, self.num_bits, self.num_hashes, self.count))
+            f.write(self.bits)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path, capacity=100000, error_rate=0.001):
+        """Loads a saved filter, or returns an empty one if missing/corrupt."""
+        bf = cls(capacity, error_rate)
+        if not os.path.exists(path):
+            return bf
+        try:
+            with open(path, "rb") as f:
+                magic, num_bits, num_hashes, count = _HEADER.unpack(f.read(_HEADER.size))
+                bits = bytearray(f.read())
+            if magic != _MAGIC or len(bits) != (num_bits + 7) // 8:
+                raise ValueError("bad bloom file")
+            bf.num_bits, bf.num_hashes, bf.count, bf.bits = num_bits, num_hashes, count, bits
+        except Exception as e:
+            print(f"[Bloom] Error loading {path}: {e}")
+        return bf
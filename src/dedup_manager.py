@@ -1,70 +1,187 @@
 """
 Deduplication Manager - Prevents duplicate news videos
 Uses content hashing to track processed articles across runs.
+Storage is an append-only JSONL log (one line per processed article),
+compacted only when expired entries are dropped.
 """
 import os
+import re
 import json
+import mmap
+import atexit
 import hashlib
+import logging
 import time
+import xxhash
+
+try:
+    import orjson  # type: ignore  # 2-5x faster JSON encode/decode (Rust)
+except ImportError:
+    orjson = None
+
+# Per-article traces; level set by LOG_LEVEL in main.py (default WARNING)
+logger = logging.getLogger(__name__)
+
+# Prefixes that differ between outlets for the same story ("Breaking: ...")
+_PREFIX_RE = re.compile(r'^(?:(?:breaking|update|just in|exclusive):\s*)+')
+# Pre-xxh3 normalization: each prefix stripped at most once, in this order
+_LEGACY_PREFIXES = ("breaking:", "update:", "just in:", "exclusive:")
+
+def _dumps(obj):
+    """JSON -> UTF-8 bytes (orjson when installed; same output format either way)."""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+def _loads(data):
+    """Accepts bytes or a memoryview slice (stdlib json needs a bytes copy)."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(bytes(data))
 
 class DedupManager:
     def __init__(self, db_file="processed_articles.json"):
+        # NOTE: filename kept for the CI cache key; contents are JSONL since the log switch
         self.db_file = db_file
         self.ttl_days = 7  # Keep entries for 7 days
+        self._fp = None  # Append handle, opened on first mark_processed
+        self._needs_compact = False
+        self._has_legacy = False  # Any MD5-keyed entries left from before the xxh3 switch
         self.data = self._load_db()
+        self.data.setdefault("hashes", {})
         self._cleanup_expired()
+        atexit.register(self.close)
     
     def _load_db(self):
-        """Load the dedup database from file."""
-        if not os.path.exists(self.db_file):
+        """
+        Load the dedup log (or a legacy {"hashes": {...}} JSON file).
+        The file is mmap'd and each line decoded straight from the mapping
+        (no full-file bytes copy + splitlines() list).
+        """
+        if not os.path.exists(self.db_file) or os.path.getsize(self.db_file) == 0:
             return {"hashes": {}}
+        hashes = {}
         try:
-            with open(self.db_file, "r", encoding="utf-8") as f:
-                return json.load(f)
+            with open(self.db_file, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                if not mm[:1024].lstrip().startswith(b'{"h"'):
+                    # Old whole-file JSON format -> rewritten as a log below
+                    legacy = _loads(mm[:])
+                    if isinstance(legacy, dict) and "hashes" in legacy:
+                        self._needs_compact = True
+                        return self._migrate_legacy_keys(legacy)
+                view = memoryview(mm)
+                try:
+                    pos, size = 0, len(mm)
+                    while pos < size:
+                        end = mm.find(b"\n", pos)
+                        if end == -1:
+                            end = size
+                        try:
+                            rec = _loads(view[pos:end])
+                            hashes[rec["h"]] = {"timestamp": rec["t"], "title": rec.get("title", ""), "source": rec.get("source", "unknown")}
+                        except (ValueError, KeyError, TypeError):
+                            pass  # Blank/truncated line (e.g. interrupted append)
+                        pos = end + 1
+                finally:
+                    view.release()
         except Exception as e:
             print(f"[Dedup] Error loading DB: {e}")
-            return {"hashes": {}}
+        return self._migrate_legacy_keys({"hashes": hashes})
+
+    def _migrate_legacy_keys(self, data):
+        """
+        Re-keys old MD5 hex entries to xxh3 ints using the stored title. Titles
+        were stored cut at 100 chars, so longer ones can't be re-hashed; those
+        stay MD5-keyed (checked via _legacy_hash) until they expire by TTL.
+        """
+        hashes = data.get("hashes", {})
+        self._has_legacy = False
+        for key in [k for k in hashes if isinstance(k, str)]:
+            title = hashes[key].get("title", "")
+            if title and len(title) < 100 and self._legacy_hash(title) == key:
+                hashes[self._generate_hash(title)] = hashes.pop(key)
+                self._needs_compact = True
+            else:
+                self._has_legacy = True
+        return data
+
+    @staticmethod
+    def _log_line(hash_key, entry):
+        return _dumps({"h": hash_key, "t": entry.get("timestamp", 0), "title": entry.get("title", ""),
+                       "source": entry.get("source", "unknown")}) + b"\n"
     
     def _save_db(self):
-        """Save the dedup database to file."""
+        """Rewrite the log compacted (only current entries), atomically via tmp + rename."""
         try:
-            with open(self.db_file, "w", encoding="utf-8") as f:
-                json.dump(self.data, f, indent=2, ensure_ascii=False)
+            self.close()
+            tmp_path = f"{self.db_file}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.writelines(self._log_line(k, v) for k, v in self.data["hashes"].items())
+            os.replace(tmp_path, self.db_file)
         except Exception as e:
             print(f"[Dedup] Error saving DB: {e}")
+
+    def _ends_with_newline(self):
+        with open(self.db_file, "rb") as f:
+            f.seek(-1, os.SEEK_END)
+            return f.read(1) == b"\n"
+
+    def close(self):
+        """Flushes + closes the append handle (also registered with atexit)."""
+        if self._fp:
+            self._fp.close()
+            self._fp = None
     
     def _cleanup_expired(self):
         """Remove entries older than TTL."""
-        current_time = time.time()
-        ttl_seconds = self.ttl_days * 24 * 60 * 60
-        
-        expired = []
-        for hash_key, entry in self.data.get("hashes", {}).items():
-            if current_time - entry.get("timestamp", 0) > ttl_seconds:
-                expired.append(hash_key)
+        cutoff = time.time() - self.ttl_days * 24 * 60 * 60
+        hashes = self.data.get("hashes", {})
         
-        for key in expired:
-            del self.data["hashes"][key]
+        # One pass: keep live entries (no expired-list + per-key del churn)
+        kept = {k: v for k, v in hashes.items() if v.get("timestamp", 0) >= cutoff}
+        expired = len(hashes) - len(kept)
+        self.data["hashes"] = kept
         
         if expired:
-            print(f"[Dedup] Cleaned up {len(expired)} expired entries.")
+            print(f"[Dedup] Cleaned up {expired} expired entries.")
+        if expired or self._needs_compact:
             self._save_db()
+            self._needs_compact = False
     
+    def _normalize_title(self, title):
+        """Lowercase, trim, and drop "breaking:"-style prefixes that differ per outlet."""
+        return _PREFIX_RE.sub('', title.strip().lower())
+
     def _generate_hash(self, title, content=""):
         """
         Generate a unique hash for an article.
         Uses title as primary key, with content as fallback similarity check.
+        xxh3-64 as an int: non-cryptographic (dedup keys need no collision
+        resistance), much faster than MD5, and a compact dict key.
+        """
+        return xxhash.xxh3_64_intdigest(self._normalize_title(title).encode('utf-8'))
+
+    def _legacy_hash(self, title):
+        """
+        MD5 hex key used before the xxh3 switch (for entries not yet expired).
+        Keeps the old single-pass prefix stripping, so "update: breaking: x"
+        still maps to the key it was stored under.
         """
-        # Normalize: lowercase, remove extra spaces
         normalized = title.lower().strip()
-        # Remove common prefixes that might differ
-        for prefix in ["breaking:", "update:", "just in:", "exclusive:"]:
+        for prefix in _LEGACY_PREFIXES:
             if normalized.startswith(prefix):
                 normalized = normalized[len(prefix):].strip()
-        
-        # Create hash
-        hash_input = normalized
-        return hashlib.md5(hash_input.encode('utf-8')).hexdigest()
+        return hashlib.md5(normalized.encode('utf-8')).hexdigest()
+
+    def _article_hash(self, article, title):
+        """
+        Hash cached on the article dict, so filter_new_articles -> mark_processed
+        hashes each kept article once instead of twice.
+        """
+        article_hash = article.get("_dedup_hash")
+        if article_hash is None:
+            article_hash = article["_dedup_hash"] = self._generate_hash(title)
+        return article_hash
     
     def is_duplicate(self, article):
         """
@@ -75,10 +192,11 @@ class DedupManager:
         if not title:
             return False  # Can't check without title
         
-        article_hash = self._generate_hash(title)
+        article_hash = self._article_hash(article, title)
+        hashes = self.data.get("hashes", {})
         
-        if article_hash in self.data.get("hashes", {}):
-            print(f"[Dedup] DUPLICATE detected: {title[:50]}...")
+        if article_hash in hashes or (self._has_legacy and self._legacy_hash(title) in hashes):
+            logger.debug("[Dedup] DUPLICATE detected: %.50s...", title)
             return True
         
         return False
@@ -91,27 +209,44 @@ class DedupManager:
         if not title:
             return
         
-        article_hash = self._generate_hash(title)
+        article_hash = self._article_hash(article, title)
         
-        self.data["hashes"][article_hash] = {
+        entry = {
             "timestamp": time.time(),
             "title": title[:100],  # Store truncated title for debugging
             "source": article.get("source_id", "unknown")
         }
+        self.data["hashes"][article_hash] = entry
         
-        self._save_db()
+        # O(1) append of one line instead of re-serializing the whole DB
+        try:
+            if self._fp is None:
+                self._fp = open(self.db_file, "ab", buffering=1 << 16)
+                if self._fp.tell() and not self._ends_with_newline():
+                    self._fp.write(b"\n")  # Don't glue onto a truncated last line
+            self._fp.write(self._log_line(article_hash, entry))
+            self._fp.flush()
+        except Exception as e:
+            print(f"[Dedup] Error saving DB: {e}")
         print(f"[Dedup] Marked as processed: {title[:50]}...")
     
     def filter_new_articles(self, articles):
         """
         Filter a list of articles, returning only new (non-duplicate) ones.
+        One pass with local references (no per-article method/dict lookups).
         """
-        new_articles = []
-        for article in articles:
-            if not self.is_duplicate(article):
-                new_articles.append(article)
+        hashes = self.data["hashes"]
+        gen = self._article_hash
+        legacy = self._legacy_hash if self._has_legacy else None
+        # Articles without a title can't be checked -> kept (same as is_duplicate)
+        new_articles = [
+            a for a in articles
+            if not (title := a.get("title"))
+            or (gen(a, title) not in hashes and not (legacy and legacy(title) in hashes))
+        ]
         
-        print(f"[Dedup] Filtered: {len(new_articles)}/{len(articles)} articles are new.")
+        print(f"[Dedup] Filtered: {len(new_articles)}/{len(articles)} articles are new "
+              f"({len(articles) - len(new_articles)} duplicates skipped).")
         return new_articles
 
 
@@ -3,9 +3,45 @@ Music Manager - Handles mood-based background music selection and mixing.
 Uses royalty-free music from public sources.
 """
 import os
+import re
 import requests
 
+_WORD_RE = re.compile(r"[a-z']+")
+
+# Mood priority: the first mood in this order with any keyword hit wins
+_MOOD_ORDER = ("urgent", "positive", "dramatic")
+
+def _build_mood_automaton(mood_words):
+    """One Aho-Corasick automaton over every mood keyword (None without pyahocorasick)."""
+    try:
+        import ahocorasick  # type: ignore
+    except ImportError:
+        return None
+    automaton = ahocorasick.Automaton()
+    for priority, mood in enumerate(_MOOD_ORDER):
+        for word in mood_words[mood]:
+            automaton.add_word(word, (priority, len(word)))
+    automaton.make_automaton()
+    return automaton
+
 class MusicManager:
+    # Mood keywords (checked in this priority order). Matched as whole words, so
+    # the headline inflections ("explosions", "launches") are listed explicitly
+    _URGENT = frozenset({"breaking", "alert", "alerts", "emergency", "emergencies",
+                         "crisis", "crises", "attack", "attacks", "attacked",
+                         "killed", "dead", "deadly", "death", "deaths",
+                         "explosion", "explosions", "war", "wars",
+                         "terror", "terrorist", "terrorists", "terrorism"})
+    _POSITIVE = frozenset({"wins", "victory", "victories", "success", "successes",
+                           "successful", "successfully", "achieves", "record", "records",
+                           "celebrates", "happy", "growth", "breakthrough", "breakthroughs",
+                           "launch", "launches", "launched", "launching"})
+    _DRAMATIC = frozenset({"scandal", "scandals", "investigation", "investigations",
+                           "accused", "arrested", "controversial", "shocking",
+                           "revealed", "exposed"})
+    # Single-pass matcher for all moods at once (falls back to the token sets)
+    _MOOD_AUTOMATON = _build_mood_automaton({"urgent": _URGENT, "positive": _POSITIVE, "dramatic": _DRAMATIC})
+
     def __init__(self):
         self.music_dir = "assets/music"
         os.makedirs(self.music_dir, exist_ok=True)
@@ -50,16 +86,30 @@ class MusicManager:
         
         try:
             print(f"[Music] Downloading {mood} music...")
-            response = requests.get(url, timeout=30)
-            response.raise_for_status()
+            # Stream to a .part file and rename only when complete, so a crashed
+            # download can never be mistaken for a cached track next run
+            tmp_path = local_path + ".part"
+            with requests.get(url, timeout=30, stream=True) as response:
+                response.raise_for_status()
+                with open(tmp_path, 'wb') as f:
+                    for chunk in response.iter_content(chunk_size=1 << 16):
+                        f.write(chunk)
+                expected = response.headers.get("Content-Length")
+                encoded = response.headers.get("Content-Encoding")
             
-            with open(local_path, 'wb') as f:
-                f.write(response.content)
+            # Content-Length counts encoded bytes, so only compare for plain bodies
+            if expected and not encoded and os.path.getsize(tmp_path) != int(expected):
+                os.remove(tmp_path)
+                print(f"[Music] Incomplete download ({expected} bytes expected), skipping")
+                return None
+            os.replace(tmp_path, local_path)
             
             print(f"[Music] Downloaded: {local_path}")
             return local_path
         except Exception as e:
             print(f"[Music] Download failed: {e}")
+            if os.path.exists(local_path + ".part"):
+                os.remove(local_path + ".part")
             return None
     
     def detect_mood(self, headline, content=""):
@@ -68,28 +118,41 @@ class MusicManager:
         Returns: 'urgent', 'positive', 'dramatic', or 'neutral'
         """
         text = (headline + " " + content).lower()
+        if self._MOOD_AUTOMATON is not None:
+            return self._detect_mood_automaton(text)
         
-        # Urgent keywords
-        urgent_words = ["breaking", "alert", "emergency", "crisis", "attack", 
-                       "killed", "dead", "death", "explosion", "war", "terror"]
-        if any(word in text for word in urgent_words):
-            return "urgent"
+        # Tokenize once, then O(1) set intersections instead of a substring
+        # scan of the whole text per keyword
+        tokens = set(_WORD_RE.findall(text))
         
-        # Positive keywords
-        positive_words = ["wins", "victory", "success", "achieves", "record", 
-                         "celebrates", "happy", "growth", "breakthrough", "launch"]
-        if any(word in text for word in positive_words):
+        if tokens & self._URGENT:
+            return "urgent"
+        if tokens & self._POSITIVE:
             return "positive"
-        
-        # Dramatic keywords
-        dramatic_words = ["scandal", "investigation", "accused", "arrested", 
-                         "controversial", "shocking", "revealed", "exposed"]
-        if any(word in text for word in dramatic_words):
+        if tokens & self._DRAMATIC:
             return "dramatic"
         
         # Default
         return "neutral"
     
+    def _detect_mood_automaton(self, text):
+        """
+        One linear scan for every keyword of every mood. Only whole-word hits
+        count (same as the token-set path); stops at the first top-priority hit.
+        """
+        best = len(_MOOD_ORDER)
+        for end, (priority, length) in self._MOOD_AUTOMATON.iter(text):
+            if priority >= best:
+                continue
+            start = end - length + 1
+            if ((start > 0 and _WORD_RE.match(text[start - 1])) or
+                    (end + 1 < len(text) and _WORD_RE.match(text[end + 1]))):
+                continue  # Inside a longer word ("war" in "software")
+            best = priority
+            if best == 0:
+                break
+        return _MOOD_ORDER[best] if best < len(_MOOD_ORDER) else "neutral"
+    
     def get_music_for_news(self, headline, content=""):
         """
         Main entry point: Detects mood and returns path to appropriate music.
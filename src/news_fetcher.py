@@ -1,15 +1,135 @@
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import os
 import json
-import time
-import feedparser
+import atexit
+import asyncio
+import hashlib
+import socket
+import logging
+import threading
+from functools import lru_cache
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+from concurrent.futures import ThreadPoolExecutor
+from src.bloom_filter import BloomFilter
+
+# Per-feed / per-article traces; level set by LOG_LEVEL in main.py (default WARNING)
+logger = logging.getLogger(__name__)
+
+# HTML parser for scraping, resolved once - the first one installed wins:
+# selectolax (Lexbor C engine) > lxml.html (libxml2 + compiled XPath) > BeautifulSoup
+HTMLParser = lxml_html = BeautifulSoup = None
+try:
+    from selectolax.lexbor import LexborHTMLParser as HTMLParser  # type: ignore
+except ImportError:
+    try:
+        import lxml.html as lxml_html  # type: ignore
+        from lxml.etree import XPath
+        # libxml2 assumes Latin-1 when a page declares no charset; default to UTF-8 instead
+        _LXML_UTF8 = lxml_html.HTMLParser(encoding="utf-8")
+    except ImportError:
+        from bs4 import BeautifulSoup
+
+# Feed parser: fastfeedparser (libxml2 via lxml, ~10x faster) when installed;
+# feedparser stays as the lenient fallback for feeds it rejects
+try:
+    import fastfeedparser  # type: ignore
+except ImportError:
+    fastfeedparser = None
+
+# Parallel RSS parse + article scrape (network-bound, so threads are enough)
+FETCH_WORKERS = 16
+# Max concurrent scrapes against one host (several feeds link to the same site)
+SCRAPE_PER_HOST = 4
+# Max HTML bytes read per scraped article
+SCRAPE_MAX_BYTES = 256 * 1024
+# Max article text kept per scraped article
+SCRAPE_MAX_CHARS = 4000
+# Last body + ETag/Last-Modified per feed, for conditional GETs
+FEED_CACHE_DIR = os.path.join(".cache", "feeds")
+
+# Smart Scraping: main content containers, in priority order
+# (1. semantic tags, 2. common classes/IDs)
+CONTENT_SELECTORS = (
+    'article', 'main',
+    'div[class*="content"]', 'div[class*="article"]', 'div[class*="story"]',
+    'div[id*="content"]', 'div[id*="article"]',
+)
+# Same containers as XPath for the lxml path (attribute *= is contains())
+if lxml_html is not None:
+    CONTENT_XPATHS = tuple(XPath(xp) for xp in (
+        '//article', '//main',
+        '//div[contains(@class, "content")]', '//div[contains(@class, "article")]', '//div[contains(@class, "story")]',
+        '//div[contains(@id, "content")]', '//div[contains(@id, "article")]',
+    ))
+
+# getaddrinfo memoized for the feed/scrape phases only (see _dns_cache)
+_cached_getaddrinfo = lru_cache(maxsize=256)(socket.getaddrinfo)
+
+@contextmanager
+def _dns_cache():
+    """
+    Memoizes socket.getaddrinfo while the block runs: each of the ~30 feed and
+    scraped hosts is resolved once instead of once per new connection. The
+    original is restored afterwards, so later Gemini / TTS / upload lookups get
+    normal DNS (record TTLs, failover).
+    """
+    if socket.getaddrinfo is _cached_getaddrinfo:
+        yield  # Nested - the outer block restores
+        return
+    original = socket.getaddrinfo
+    socket.getaddrinfo = _cached_getaddrinfo
+    try:
+        yield
+    finally:
+        socket.getaddrinfo = original
+
+def _canonical_url(url):
+    """
+    Key for "same article" within one run: scheme, www., case of the host,
+    fragment, utm_* tracking params and a trailing slash don't matter.
+    """
+    parts = urlsplit(url.strip())
+    query = "&".join(q for q in parts.query.split("&") if q and not q.startswith("utm_"))
+    host = parts.netloc.lower()
+    if host.startswith("www."):
+        host = host[4:]
+    return f"{host}{parts.path.rstrip('/')}?{query}"
+
+def _entry_image_url(entry):
+    """
+    First image URL of a feed entry: media:content, else the first image/* link.
+    feedparser lists <enclosure> under links; fastfeedparser under enclosures (url, not href).
+    """
+    media = getattr(entry, "media_content", None)
+    if media and isinstance(media, list) and media[0].get("url"):
+        return media[0]["url"]
+    links = (getattr(entry, "links", None) or []) + (getattr(entry, "enclosures", None) or [])
+    return next((l.get("href") or l.get("url") for l in links
+                 if isinstance(l, dict) and l.get("type", "").startswith("image/")), None)
 
 class NewsFetcher:
     def __init__(self):
         self.newsdata_api_key = os.getenv("NEWSDATA_API_KEY")
         self.worldnews_api_key = os.getenv("WORLDNEWS_API_KEY")
+        # Compact record of every article that became a video (persisted between runs
+        # via the CI cache). processed_ids.txt is only read, to seed it.
         self.processed_ids_file = "processed_ids.txt"
+        self.processed_bloom_file = os.path.join(".cache", "processed.bloom")
         self.processed_ids = self._load_processed_ids()
+        self._processed_dirty = False  # New IDs not yet on disk (written by flush_processed_ids)
+        atexit.register(self.flush_processed_ids)  # Last-chance save for any unflushed IDs
+
+        # Shared keep-alive session for scraping + news APIs: repeat hosts reuse TCP+TLS connections
+        self._session = requests.Session()
+        self._session.headers.update({"User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"})
+        adapter = HTTPAdapter(pool_connections=FETCH_WORKERS, pool_maxsize=32,
+                              max_retries=Retry(total=2, backoff_factor=0.3))
+        self._session.mount("https://", adapter)
+        self._session.mount("http://", adapter)
+        self._host_slots = {}  # netloc -> Semaphore(SCRAPE_PER_HOST)
         
         # EXPANDED RSS FEEDS - Indian Sources (National)
         self.rss_feeds_india = [
@@ -69,17 +189,31 @@ class NewsFetcher:
         self.rss_feeds_world = self.rss_feeds_international
 
     def _load_processed_ids(self):
-        if not os.path.exists(self.processed_ids_file):
-            return set()
-        with open(self.processed_ids_file, "r") as f:
-            return set(line.strip() for line in f)
+        """Bloom filter of processed IDs: O(1) lookups at ~15 bits per ID instead of a set of strings."""
+        bloom = BloomFilter.load(self.processed_bloom_file)
+        if os.path.exists(self.processed_ids_file):
+            # Legacy text file -> fold its IDs in (no longer written to)
+            with open(self.processed_ids_file, "r") as f:
+                for line in f:
+                    if line.strip():
+                        bloom.add(line.strip())
+        if bloom.is_saturated():
+            print(f"[Bloom] {len(bloom)} processed IDs exceed capacity {bloom.capacity}; "
+                  f"delete {self.processed_bloom_file} (or raise capacity) to reset the error rate.")
+        return bloom
 
     def _save_processed_id(self, article_id):
         # Clean ID to be file-safe
         safe_id = str(article_id).replace("\n", "").strip()
-        with open(self.processed_ids_file, "a") as f:
-            f.write(f"{safe_id}\n")
-        self.processed_ids.add(safe_id)
+        if self.processed_ids.add(safe_id):
+            self._processed_dirty = True
+
+    def flush_processed_ids(self):
+        """Persists the Bloom filter once (atomic) if any IDs were added."""
+        if not self._processed_dirty:
+            return
+        self.processed_ids.save(self.processed_bloom_file)
+        self._processed_dirty = False
 
     def _is_developing_story_only(self, article):
         """Return True if article is a 'developing story' placeholder - we do not pick these."""
@@ -95,17 +229,20 @@ class NewsFetcher:
         """
         if mode == "indian":
             print("Fetching from Indian RSS feeds only...")
-            raw = self._fetch_rss_sources(self.rss_feeds_india)
+            feed_urls = self.rss_feeds_india
         elif mode == "international":
             print("Fetching from International RSS feeds only...")
-            raw = self._fetch_rss_sources(self.rss_feeds_international)
+            feed_urls = self.rss_feeds_international
         else:
             print("Fetching from ALL RSS feeds (India + International)...")
-            raw = self._fetch_rss_sources(self.rss_feeds_india + self.rss_feeds_international)
+            feed_urls = self.rss_feeds_india + self.rss_feeds_international
+        with _dns_cache():
+            raw = self._fetch_rss_sources(feed_urls)
         # Do not pick developing-story-only articles
         filtered = [a for a in raw if not self._is_developing_story_only(a)]
         if len(filtered) < len(raw):
             print(f"[Filter] Skipped {len(raw) - len(filtered)} developing-story-only article(s).")
+        self.flush_processed_ids()
         return filtered
 
     def fetch_indian_news(self):
@@ -122,6 +259,7 @@ class NewsFetcher:
         Call this ONLY after video is successfully generated.
         """
         self._save_processed_id(article_id)
+        self.flush_processed_ids()
 
     def _fetch_worldnews(self):
         """
@@ -138,7 +276,7 @@ class NewsFetcher:
             "number": 5
         }
         try:
-            response = requests.get(url, params=params)
+            response = self._session.get(url, params=params)
             response.raise_for_status()
             data = response.json()
             
@@ -166,7 +304,7 @@ class NewsFetcher:
         url = "https://newsdata.io/api/1/news"
         params["apikey"] = self.newsdata_api_key
         try:
-            response = requests.get(url, params=params)
+            response = self._session.get(url, params=params)
             response.raise_for_status()
             data = response.json()
             
@@ -184,114 +322,259 @@ class NewsFetcher:
             print(f"NewsData.io failed: {e}")
             return []
 
+    def _extract_paragraphs(self, html):
+        """
+        Yields the stripped <p> texts of the main content container, lazily, so
+        the caller stops paying for text extraction once it has enough.
+        selectolax (C HTML engine, ~10-30x faster) when installed, else lxml, else BeautifulSoup.
+        """
+        if HTMLParser is not None:
+            tree = HTMLParser(html)
+            # Smart Scraping: first matching content container, else whole page.
+            # Lazy: selectors are tried in priority order and the first hit stops
+            # the search (a single union query would rank by document order instead).
+            target_container = next(
+                (node for node in map(tree.css_first, CONTENT_SELECTORS) if node is not None), tree
+            )
+            return (p.text().strip() for p in target_container.css("p"))
+
+        if lxml_html is not None:
+            if not html.strip():
+                return []  # lxml raises on an empty document
+            root = lxml_html.fromstring(html, parser=None if b"charset" in html[:2048].lower() else _LXML_UTF8)
+            target_container = next((nodes[0] for nodes in (xp(root) for xp in CONTENT_XPATHS) if nodes), root)
+            return (p.text_content().strip() for p in target_container.iter("p"))
+
+        soup = BeautifulSoup(html, "html.parser")
+        target_container = next(
+            (node for node in map(soup.select_one, CONTENT_SELECTORS) if node is not None), soup
+        )
+        return (p.get_text().strip() for p in target_container.find_all("p"))
+
+    def _host_slot(self, url):
+        """Per-host semaphore so the pool doesn't hit one site with every worker at once."""
+        host = urlsplit(url).netloc
+        slot = self._host_slots.get(host)
+        if slot is None:
+            slot = self._host_slots.setdefault(host, threading.Semaphore(SCRAPE_PER_HOST))
+        return slot
+
     def _scrape_content(self, url):
         """
         Scrapes the main text content from a news URL.
         """
         try:
-            from bs4 import BeautifulSoup
-            headers = {"User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"}
-            resp = requests.get(url, headers=headers, timeout=10) # Increased timeout
-            if resp.status_code != 200:
-                return ""
-            
-            soup = BeautifulSoup(resp.content, "html.parser")
+            # Stream and stop at SCRAPE_MAX_BYTES: the article text sits near the top,
+            # the rest of a multi-MB page is ads/scripts we would throw away anyway
+            # (download only holds the host slot; parsing below runs without it)
+            with self._host_slot(url), self._session.get(url, timeout=10, stream=True) as resp: # Increased timeout
+                if resp.status_code != 200:
+                    return ""
+                # PDFs, images, feeds etc: no <p> text to find, don't download the body
+                if "html" not in resp.headers.get("Content-Type", "text/html").lower():
+                    return ""
+                # Chunks joined once at the end (a growing bytearray + bytes() copy
+                # re-buffered the page twice)
+                chunks, size = [], 0
+                for chunk in resp.iter_content(chunk_size=32768):
+                    chunks.append(chunk)
+                    size += len(chunk)
+                    if size >= SCRAPE_MAX_BYTES:
+                        break
+                html = b"".join(chunks)
             
-            # Smart Scraping: Prioritize main content containers
-            content_candidates = []
+            # Get only P tags from the best container (text already stripped)
+            paragraphs = self._extract_paragraphs(html)
             
-            # 1. Semantic Tags
-            for tag in ['article', 'main']:
-                found = soup.find(tag)
-                if found:
-                    content_candidates.append(found)
-                    
-            # 2. Common Classes/IDs
-            for selector in ['div[class*="content"]', 'div[class*="article"]', 'div[class*="story"]', 'div[id*="content"]', 'div[id*="article"]']:
-                found = soup.select_one(selector)
-                if found:
-                    content_candidates.append(found)
-
-            # Extract text from best candidate or fallback to body
-            target_container = content_candidates[0] if content_candidates else soup
-
-            # Get only P tags from the best container
-            paragraphs = target_container.find_all("p")
+            # One pass: filter out very short paragraphs (usually ads/nav), clean up
+            # whitespace per paragraph, and stop once there is enough text.
+            # Short ones are kept aside (up to the same cap) in case nothing is long.
+            clean_paragraphs, size = [], 0
+            short_paragraphs, short_size = [], 0
+            for p in paragraphs:
+                if len(p) > 50:
+                    clean_paragraphs.append(" ".join(p.split()))
+                    size += len(clean_paragraphs[-1]) + 1
+                    if size > SCRAPE_MAX_CHARS:
+                        break
+                elif p and short_size <= SCRAPE_MAX_CHARS and not clean_paragraphs:
+                    short_paragraphs.append(" ".join(p.split()))
+                    short_size += len(short_paragraphs[-1]) + 1
             
-            # Filter out very short paragraphs (usually ads/nav)
-            clean_paragraphs = [p.get_text().strip() for p in paragraphs if len(p.get_text().strip()) > 50]
-            
-            if not clean_paragraphs:
-                 # If filtering was too aggressive, take all
-                 clean_paragraphs = [p.get_text().strip() for p in paragraphs]
-
-            text = " ".join(clean_paragraphs)
-            
-            # Clean up whitespace
-            text = " ".join(text.split())
-            return text[:4000] # Increased limit slightly
+            # If filtering was too aggressive, take all
+            return " ".join(clean_paragraphs or short_paragraphs)[:SCRAPE_MAX_CHARS] # Increased limit slightly
         except Exception as e:
-            print(f"Scraping failed for {url}: {e}")
+            logger.warning("Scraping failed for %s: %s", url, e)
             return ""
 
+    def _feed_cache_paths(self, url):
+        key = hashlib.blake2b(url.encode("utf-8"), digest_size=16).hexdigest()
+        return os.path.join(FEED_CACHE_DIR, f"{key}.xml"), os.path.join(FEED_CACHE_DIR, f"{key}.json")
+
+    def _conditional_headers(self, body_path, meta_path):
+        """If-None-Match / If-Modified-Since from the last 200 (only if its body is cached)."""
+        headers = {}
+        if os.path.exists(body_path) and os.path.exists(meta_path):
+            with open(meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            if meta.get("etag"):
+                headers["If-None-Match"] = meta["etag"]
+            if meta.get("last_modified"):
+                headers["If-Modified-Since"] = meta["last_modified"]
+        return headers
+
+    def _feed_body(self, url, status, body, resp_headers, body_path, meta_path):
+        """
+        Conditional GET result -> feed bytes: an unchanged feed answers 304
+        with no body and the cached copy is used. None on failure.
+        """
+        if status == 304:
+            with open(body_path, "rb") as f:
+                return f.read()
+        if status == 200:
+            meta = {"etag": resp_headers.get("ETag"), "last_modified": resp_headers.get("Last-Modified")}
+            if meta["etag"] or meta["last_modified"]:
+                self._write_feed_cache(body_path, body, meta_path, meta)
+            return body
+        logger.warning("RSS fetch failed for %s: HTTP %s", url, status)
+        return None
+
+    async def _afetch_feed_body(self, session, url):
+        try:
+            logger.debug("Parsing RSS: %s", url)
+            body_path, meta_path = self._feed_cache_paths(url)
+            headers = self._conditional_headers(body_path, meta_path)
+            async with session.get(url, headers=headers) as resp:
+                body = await resp.read() if resp.status == 200 else b""
+                return self._feed_body(url, resp.status, body, resp.headers, body_path, meta_path)
+        except Exception as e:
+            logger.warning("RSS fetch failed for %s: %s", url, e)
+            return None
+
+    async def _afetch_parsed(self, session, url, pool):
+        """Downloads one feed, then parses it on the pool while other downloads continue."""
+        body = await self._afetch_feed_body(session, url)
+        return await asyncio.get_running_loop().run_in_executor(pool, self._parse_feed_body, body)
+
+    async def _afetch_feeds(self, urls, pool):
+        """Downloads + parses every feed concurrently on one event loop (results keep feed order)."""
+        import aiohttp
+        timeout = aiohttp.ClientTimeout(total=10)
+        connector = aiohttp.TCPConnector(limit=32, ttl_dns_cache=300)
+        async with aiohttp.ClientSession(timeout=timeout, connector=connector,
+                                         headers={"User-Agent": self._session.headers["User-Agent"]}) as session:
+            return await asyncio.gather(*[self._afetch_parsed(session, url, pool) for url in urls])
+
+    def _fetch_feed_body(self, url):
+        """Thread-pool fallback for _afetch_feed_body (no aiohttp)."""
+        try:
+            logger.debug("Parsing RSS: %s", url)
+            body_path, meta_path = self._feed_cache_paths(url)
+            headers = self._conditional_headers(body_path, meta_path)
+            resp = self._session.get(url, headers=headers, timeout=10)
+            return self._feed_body(url, resp.status_code, resp.content, resp.headers, body_path, meta_path)
+        except Exception as e:
+            logger.warning("RSS fetch failed for %s: %s", url, e)
+            return None
+
+    def _parse_feed_body(self, body):
+        """Parses downloaded feed bytes (CPU only); None on failure."""
+        if body is None:
+            return None
+        if fastfeedparser is not None:
+            try:
+                return fastfeedparser.parse(body)
+            except Exception:
+                pass  # Malformed XML -> feedparser below (recovers what it can)
+        try:
+            import feedparser  # Only needed once there are feeds to parse
+            return feedparser.parse(body)
+        except Exception as e:
+            logger.warning("RSS parse failed: %s", e)
+            return None
+
+    def _write_feed_cache(self, body_path, body, meta_path, meta):
+        """Saves feed body + validators (tmp + rename so readers never see half a file)."""
+        try:
+            os.makedirs(FEED_CACHE_DIR, exist_ok=True)
+            with open(f"{body_path}.tmp", "wb") as f:
+                f.write(body)
+            os.replace(f"{body_path}.tmp", body_path)
+            with open(f"{meta_path}.tmp", "w", encoding="utf-8") as f:
+                json.dump(meta, f)
+            os.replace(f"{meta_path}.tmp", meta_path)
+        except Exception as e:
+            print(f"[Feed Cache] Write failed: {e}")
+
     def _fetch_rss_sources(self, feed_urls):
         """
         Fetch news from curated RSS feeds (India + World).
         We only use title + summary + link; full article stays on source site.
+        Feeds are downloaded concurrently, so wall time is ~the slowest feed, not
+        the sum. Pages are NOT scraped here (full_content starts as the feed
+        summary) - see scrape_full_content.
         """
-        articles = []
-        for url in feed_urls:
+        with ThreadPoolExecutor(max_workers=FETCH_WORKERS) as pool:
+            # Stage 1: download every feed at once (async I/O); each feed is parsed
+            # as soon as its bytes arrive, overlapping with the slower downloads
             try:
-                print(f"Parsing RSS: {url}")
-                feed = feedparser.parse(url)
-                for entry in feed.entries[:3]: # Limit to top 3 to save scraping time
+                feeds = asyncio.run(self._afetch_feeds(feed_urls, pool))
+            except ImportError:
+                feeds = list(pool.map(lambda url: self._parse_feed_body(self._fetch_feed_body(url)), feed_urls))
+
+        # Stage 2: pick new entries
+        articles = []
+        seen_links = set()
+        for feed in feeds:
+            if feed is None:
+                continue
+            for entry in feed.entries[:3]: # Limit to top 3 per feed
+                try:
                     link = getattr(entry, "link", None)
                     title = getattr(entry, "title", None)
-                    summary = getattr(entry, "summary", "") or ""
                     if not title or not link:
                         continue
                     article_id = link
-                    if article_id in self.processed_ids:
+                    # Same story in two feeds (often with different tracking params)
+                    # is scraped + offered to Gemini once
+                    canonical = _canonical_url(link)
+                    if article_id in self.processed_ids or canonical in seen_links:
                         continue
-                        
-                    # SCRAPE FULL CONTENT
-                    print(f"Scraping full content for: {title[:30]}...")
-                    full_text = self._scrape_content(link)
-                    
-                    if not full_text:
-                        full_text = summary # Fallback
-
-                    # Try to pull an image URL if present.
-                    image_url = None
-                    media_content = getattr(entry, "media_content", None)
-                    if media_content and isinstance(media_content, list):
-                        image_url = media_content[0].get("url")
-                    if not image_url and hasattr(entry, "links"):
-                        for l in entry.links:
-                            if isinstance(l, dict) and l.get("type", "").startswith("image/"):
-                                image_url = l.get("href")
-                                break
-                    
-                    # ALSO try to find og:image if scraping
-                    if not image_url and full_text:
-                         try:
-                            # Quick dirty check if we already parsed soup (optimization: return soup from scrape?)
-                            # For simplicity, we just rely on RSS image for now to save complexity.
-                            pass
-                         except: pass
+                    seen_links.add(canonical)
 
+                    # feedparser: summary; fastfeedparser: description
+                    summary = getattr(entry, "summary", None) or getattr(entry, "description", None) or ""
                     std_article = {
-                        "article_id": article_id,
+                        "article_id": link,
                         "title": title,
                         "description": summary[:600],
-                        "full_content": full_text, # NEW FIELD
-                        "image_url": image_url,
+                        "full_content": summary, # Replaced by the scraped page in scrape_full_content
+                        "image_url": _entry_image_url(entry), # Try to pull an image URL if present.
                         "source_id": "rss",
                         "source_url": link,
                     }
                     articles.append(std_article)
-            except Exception as e:
-                print(f"RSS fetch failed for {url}: {e}")
+                except Exception as e:
+                    logger.warning("RSS entry failed for %s: %s", getattr(entry, 'link', '?'), e)
+        return articles
+
+    def scrape_full_content(self, articles):
+        """
+        SCRAPE FULL CONTENT for just these articles (concurrently), in place.
+        Called on the final candidate pool, after dedup/filtering, so the ~80
+        fetched entries aren't all scraped. A page that yields no text keeps the
+        feed summary as full_content.
+        """
+        targets = [a for a in articles if a.get("source_url")]
+        if not targets:
+            return articles
+        for art in targets:
+            logger.debug("Scraping full content for: %.30s...", art.get("title", ""))
+        with _dns_cache(), ThreadPoolExecutor(max_workers=min(FETCH_WORKERS, len(targets))) as pool:
+            full_texts = list(pool.map(self._scrape_content, [a["source_url"] for a in targets]))
+        for art, full_text in zip(targets, full_texts):
+            if full_text:
+                art["full_content"] = full_text
         return articles
 
 if __name__ == "__main__":
@@ -0,0 +1,65 @@
+"""
+Script Cleaner - Strips voice/narrator metadata Gemini leaks into spoken scripts.
+Shared by ScriptGenerator (first line of defense) and main.py (second line).
+Patterns are compiled once at import and results are memoized per script line.
+Python re on purpose: its whitespace / word-boundary classes are Unicode-aware
+(non-breaking spaces etc. in Gemini output), where RE2's are ASCII-only.
+"""
+import re
+from functools import lru_cache
+
+
+# DIRECT STRING REMOVALS (highest priority - exact matches)
+_EXACT_PATTERNS = (
+    "Voice name =", "voice name =", "Voice Name =", "VOICE NAME =",
+    "Speak voice name =", "speak voice name =", "Speak voice name=",
+    "speek voice name =", "speek voice name=", "Voice =", "voice =", "VOICE =",
+    "Name =", "name =", "NAME =", "Speak voice =", "speak voice =",
+    "Voice = Inner Engineer", "Inner Engineer", "inner engineer", "ingenier", "inginer",
+)
+
+# "Voice:", "Narrator:", etc at START of any line
+_LINE_PREFIX_RE = re.compile(r'^(Voice|Narrator|Speaker|Audio|Voiceover|VO|Name)\s*[:=\-]?\s*', re.IGNORECASE | re.MULTILINE)
+# ANY word followed by = or : at the very start
+_LEADING_LABEL_RE = re.compile(r'^[A-Za-z]+\s*[:=]\s*')
+# Emotion/direction tags like (Happy), [Excited], {Serious}
+_EMOTION_TAG_RE = re.compile(r'[\(\[\{](Happy|Sad|Excited|Serious|Urgent|Warm|Caution|Pause|Beat)[\)\]\}]', re.IGNORECASE)
+# Inline "Voice:" ANYWHERE in text
+_INLINE_LABEL_RE = re.compile(r'\b(Voice|Narrator|Speaker|Audio|Name)\s*[:=]\s*', re.IGNORECASE)
+# [pause], [URGENT], etc.
+_MARKER_RE = re.compile(r'\[(pause|urgent|beat|sfx|music)\]', re.IGNORECASE)
+# Standalone "Voice", "Name", "Inner Engineer", "Speak voice (name)" and typos
+_STANDALONE_RES = (
+    re.compile(r'\b(Voice|Name)\b\s*', re.IGNORECASE),
+    re.compile(r'\bInner\s*Engineer\b', re.IGNORECASE),
+    re.compile(r'\b(ingenier|inginer)\b', re.IGNORECASE),
+    re.compile(r'\bSpeak\s+voice\s+name\b', re.IGNORECASE),
+    re.compile(r'\bSpeak\s+voice\b', re.IGNORECASE),
+    re.compile(r'\bspeek\s+voice\s+name\b', re.IGNORECASE),
+)
+_WHITESPACE_RE = re.compile(r'\s+')
+
+
+@lru_cache(maxsize=256)
+def clean_script_text(text):
+    """
+    Returns the spoken sentence with every metadata prefix/tag removed.
+    Memoized: the same script line is only cleaned once per process.
+    """
+    if not text:
+        return ""
+
+    clean = text.strip()
+    for bad_pattern in _EXACT_PATTERNS:
+        clean = clean.replace(bad_pattern, "")
+
+    clean = _LINE_PREFIX_RE.sub('', clean)
+    clean = _LEADING_LABEL_RE.sub('', clean.strip())
+    clean = _EMOTION_TAG_RE.sub('', clean)
+    clean = _INLINE_LABEL_RE.sub('', clean)
+    clean = _MARKER_RE.sub('', clean)
+    for pattern in _STANDALONE_RES:
+        clean = pattern.sub('', clean)
+
+    # Clean up double spaces and trim
+    return _WHITESPACE_RE.sub(' ', clean).strip()
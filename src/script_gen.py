@@ -1,117 +1,89 @@
 import os
+import re
 import json
 import time
+import atexit
+import html
+import random
+import hashlib
+import threading
 import requests
-
-class ScriptGenerator:
-    def __init__(self):
-        self.api_key = os.getenv("GEMINI_API_KEY")
-        if not self.api_key:
-            print("Warning: GEMINI_API_KEY not found.")
-        self.base_url = "https://generativelanguage.googleapis.com"
-        # If we hit quota / config issues, we can short‑circuit further Gemini calls
-        # in this run and rely on the local backup template instead.
-        self.gemini_disabled = False
-
-    def _discover_model(self):
-        """
-        Dynamically asks Gemini API: "What models can I use?"
-        Returns the best available model name.
-        """
-        if self.gemini_disabled or not self.api_key:
-            return None
-        try:
-            # We check v1beta first as it has the newer models
-            url = f"{self.base_url}/v1beta/models?key={self.api_key}"
-            print(f"Discovering models from: {url.split('?')[0]}...")
-            
-            response = requests.get(url)
-            if response.status_code != 200:
-                print(f"ListModels failed: {response.status_code} - {response.text}")
-                return None
-            
-            data = response.json()
-            available_models = []
-            
-            for m in data.get('models', []):
-                # We need a model that supports 'generateContent'
-                if "generateContent" in m.get("supportedGenerationMethods", []):
-                    # Strip 'models/' prefix if present for clean usage
-                    name = m['name'].replace("models/", "")
-                    available_models.append(name)
-            
-            print(f"Available Models: {available_models}")
-            
-            # Priority Logic: Prefer 2.0 Flash -> 1.5 Flash -> Others
-            # Note: "gemini-pro-latest" might be v1beta only. 
-            # Safer to default all to v1beta unless explicitly known as v1 legacy.
-            
-            for m in available_models:
-                if "gemini-2.0-flash" in m: return (m, "v1beta")
-            for m in available_models:
-                if "gemini-1.5-flash" in m: return (m, "v1beta")
-            
-            # If we fall back to generic names, be careful
-            for m in available_models:
-                if "gemini-pro" in m: 
-                    # check if it's the legacy v1 or new v1beta
-                    if "latest" in m or "1.5" in m:
-                        return (m, "v1beta")
-                    return (m, "v1")
-                
-            # If nothing specific found, take the first valid one and try v1beta (most modern)
-            if available_models:
-                return (available_models[0], "v1beta")
-                
-            return None
-            
-        except Exception as e:
-            print(f"Model discovery error: {e}")
-            return None
-
-    def pick_and_generate_script(self, articles):
-        """
-        COMBINED: Picks the best article AND generates the video script in ONE Gemini call.
-        This avoids hitting per-minute rate limits by reducing API calls.
-        Returns: dict with 'chosen_article' and 'script' keys, or None on failure.
-        """
-        if not articles:
-            return None
-        if self.gemini_disabled or not self.api_key:
-            print("Gemini disabled. Using backup for first article.")
-            return {"chosen_article": articles[0], "script": self._backup_template(articles[0])}
-
-        # 1. OPTIONAL: Small delay to avoid rapid-fire hits if multiple workflows run
-        print("[Gemini] Cooling down for 5s before API call...")
-        time.sleep(5)
-
-        model_info = self._discover_model()
-        if not model_info:
-            print("No model available. Using backup.")
-            return {"chosen_article": articles[0], "script": self._backup_template(articles[0])}
-
-        model_name, version = model_info
-        print(f"[COMBINED] Using Model: {model_name}")
-
-        # Build listing for the prompt - FULL CONTENT for detailed scripts
-        items_text = ""
-        for idx, art in enumerate(articles):
-            t = art.get("title", "") or ""
-            # Use FULL content (up to 4000 chars) for better context
-            d = (art.get("full_content", "") or art.get("description", "") or "")[:4000]
-            d = d.replace("\n", " ").strip()
-            items_text += f"[{idx}] {t}\n{d}\n\n"
-
-        prompt = f"""
+from functools import lru_cache
+from types import SimpleNamespace
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from src.script_cleaner import clean_script_text
+
+try:
+    import orjson  # type: ignore  # 2-5x faster JSON decode, ~10x faster encode (Rust)
+except ImportError:
+    orjson = None
+
+try:
+    import lxml.html as lxml_html  # type: ignore  # libxml2 (C), ~10-20x faster than bs4 + html.parser
+except ImportError:
+    lxml_html = None
+
+try:
+    import httpx  # type: ignore
+    import h2  # type: ignore  # noqa: F401  (httpx's HTTP/2 support)
+except ImportError:
+    httpx = None
+
+def _json_loads(data):
+    """Parses a Gemini response body / text (orjson when installed, same objects either way)."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+def _json_dumps(obj):
+    """Request body bytes (orjson when installed - ~10x faster than json.dumps, same JSON)."""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+# Article text sent per script request (after HTML stripping). Longer scraped pages
+# mostly add tokens - and so cost + latency - not facts the script needs.
+MAX_CTX = 2000
+
+# Any tag - fallback stripper when lxml is missing or can't parse the snippet
+_TAG_RE = re.compile(r'<[^>]+>')
+
+@lru_cache(maxsize=128)
+def _clean_html(raw):
+    """
+    Visible text of an HTML snippet (RSS summaries, backup template), text nodes
+    joined by single spaces; plain text is returned as-is.
+    """
+    if "<" not in raw:
+        return raw
+    try:
+        if lxml_html is None:
+            raise ValueError("lxml not installed")
+        text = " ".join(lxml_html.fromstring(raw).xpath("//text()[not(parent::script or parent::style)]"))
+    except Exception:
+        text = html.unescape(_TAG_RE.sub(" ", raw))
+    return " ".join(text.split())
+
+def _article_text(article, limit=MAX_CTX):
+    """PREFER FULL SCRAPED CONTENT, then the feed description; HTML-stripped, capped at limit chars."""
+    raw = article.get('full_content', '') or article.get('description', '') or article.get('content', '')[:500]
+    return _clean_html(raw or "")[:limit]
+
+# Prompts are built once at import; per call only the article fields are .format()ed
+# in (literal JSON braces are doubled for str.format). The per-call part always comes
+# LAST, so every request shares one byte-identical instruction prefix and Gemini's
+# implicit context caching can reuse it (cheaper, faster input processing).
+_PICK_AND_SCRIPT_PROMPT = """
 You are a **top tier Indian news curator and video script writer** for viral vertical videos (YouTube Shorts, Reels).
 
 ## Task 1: Choose the BEST article
-Below are {len(articles)} news articles. Pick the ONE that will go most viral.
+The candidate news articles are listed at the end, under "## Articles". Pick the ONE that will go most viral.
 
 IMPORTANT: Do NOT choose an article that is only a "developing story" or has no real content. Prefer complete, substantive news.
 
-{items_text}
-
 ## Task 2: Generate Video Script for chosen article (TARGET: 60 seconds)
 Create a video script that fits within a 60-SECOND SHORT VIDEO timeframe.
 
@@ -183,29 +155,544 @@ Strictly output JSON only, no extra text:
 }}
 
 FINAL REMINDER: If you write "Voice" or "name =" in script field, it will be spoken aloud and ruin the video.
+
+## Articles ({count})
+{items_text}"""
+
+_SCRIPT_PROMPT = """
+You are a **top tier Indian news script writer** for viral vertical videos (YouTube Shorts, Reels).
+Your goal is to make this video go VIRAL (10000% engagement).
+
+Write the script for the news article at the end.
+
+Strictly output JSON only, no extra text:
+{{
+    "headline": "CLICKBAIT TITLE (max 60 chars) - Use ALL CAPS, Emojis, and Questions. MUST SHOCK THE VIEWER.",
+    "ticker_text": "Breaking News • Viral Update • Must Watch",
+    "segments": [
+        {{ "visual": "Slide 1 text (Max 15 words)", "script": "Spoken sentence for this slide." }},
+        {{ "visual": "Slide 2 text (Max 15 words)", "script": "Spoken sentence for this slide." }},
+        {{ "visual": "Slide 3 text (Max 15 words)", "script": "Spoken sentence for this slide." }}
+    ],
+    "viral_description": "First 3 lines must be a CLIFFHANGER HOOK! Then detailed summary. Use emotional language (Shocking, Heartbreaking, Amazing). Add 'Subscribe for more updates'.",
+    "viral_tags": ["#Shorts", "#Viral", "#Trending", "#News", "SPECIFIC_ENTITY_TAGS_HERE"],
+    "video_search_keywords": ["keyword1", "keyword2", "keyword3", "high search volume terms"]
+}}
+
+Rules for "viral_tags":
+- DYNAMIC: Include specific names of people, places, and events mentioned in the article (e.g., #Modi, #ViratKohli, #DelhiRains).
+- TRENDING: Mix high-volume generic tags (#India) with niche specific tags.
+- QUANTITY: Generate at least 15 high-impact tags.
+
+Rules for "segments":
+- Create 3-5 segments that flow logically.
+- **SYNC IS CRITICAL**: The "script" text MUST match exactly what should be spoken while the "visual" text is shown.
+- **NO FILLER**: Start immediately with the news.
+- Tone: Urgent, Insider, Fast-paced, Sensational.
+- MAKE IT SOUND VIRAL. Not boring news.
+
+Rules for visual text:
+- NOT subtitles. Visual Headlines. Large font, few words.
+        
+News article:
+Title: {title}
+Details: {description}
 """
 
-        # RETRY LOGIC with Exponential Backoff
+_RANKING_PROMPT = """
+You are helping choose which news story will go most viral as a short vertical video for 'Logic Vault'.
+
+Here are candidate stories (index: title | short description):
+{items}
+
+Think about which one is the most emotionally engaging, surprising, or highly relevant for a general audience today.
+Return ONLY JSON of the form: {{"chosen_index": <NUMBER>}} with no extra text.
+        """
+
+# Hedged requests: if a model hasn't answered after this many seconds, the next
+# discovered model is fired alongside it and the first 200 wins. Generous on
+# purpose - a normal generation takes several seconds and each hedge spends quota.
+GEMINI_HEDGE_DELAY = 20
+GEMINI_MAX_MODELS = 3
+
+# Discovered model list is reused for this long (in memory and on disk), so
+# repeat calls and reruns skip the ListModels round trip
+GEMINI_MODELS_TTL = 60 * 60
+GEMINI_MODELS_FILE = os.path.join(".cache", "gemini_models.json")
+
+# (connect, read) seconds for every Gemini request - a hung endpoint can't stall the
+# run. With streaming, read is the longest gap between chunks, not the whole reply.
+GEMINI_TIMEOUT = (5, 60)
+# generateContent answers worth retrying (rate limit / server side), and how often.
+# Waits honour Retry-After, else GEMINI_BACKOFF * 2**attempt + jitter, capped.
+GEMINI_RETRY_STATUSES = (429, 500, 502, 503, 504)
+GEMINI_RETRIES = 3
+GEMINI_BACKOFF = 0.5
+GEMINI_MAX_BACKOFF = 30
+
+def _retry_delay(response, attempt):
+    """Seconds to wait before retrying after response (attempt counts from 0)."""
+    try:
+        delay = float(response.headers.get("Retry-After"))
+    except (TypeError, ValueError):
+        delay = GEMINI_BACKOFF * 2 ** attempt + random.uniform(0, GEMINI_BACKOFF)
+    return min(delay, GEMINI_MAX_BACKOFF)
+
+# A 429 that outlives those retries is the per-minute quota: pick_and_generate_script
+# then waits RetryInfo.retryDelay from the error body, else GEMINI_QUOTA_BACKOFF * 2**attempt
+# (15s, 30s, 60s), capped at GEMINI_QUOTA_MAX_WAIT.
+GEMINI_QUOTA_BACKOFF = 15
+GEMINI_QUOTA_MAX_WAIT = 60
+
+def _quota_delay(response, attempt):
+    """Seconds to wait before asking again after a 429 (attempt counts from 0)."""
+    try:
+        for detail in _json_loads(response.content)["error"].get("details", []):
+            if detail.get("@type", "").endswith("google.rpc.RetryInfo"):
+                return min(float(detail["retryDelay"].rstrip("s")), GEMINI_QUOTA_MAX_WAIT)
+    except (ValueError, KeyError, TypeError, AttributeError):
+        pass
+    return min(GEMINI_QUOTA_BACKOFF * 2 ** attempt, GEMINI_QUOTA_MAX_WAIT)
+
+# A 400 that names one of these (camelCase or the proto snake_case) is a JSON-mode
+# rejection, e.g. 'Unknown name "responseMimeType" at 'generation_config''
+_JSON_MODE_FIELDS = ("responseMimeType", "response_mime_type", "generationConfig", "generation_config")
+
+# Markdown code fences Gemini wraps JSON in (```json ... ```), removed in one scan.
+# Only matters in text mode (v1 models / JSON mode rejected); JSON-mode replies have none.
+_FENCE_RE = re.compile(r"```(?:json)?")
+
+def _parse_json_text(text):
+    """The JSON value in Gemini's reply text (fences stripped). Raises ValueError if incomplete/invalid."""
+    return _json_loads(_FENCE_RE.sub('', text).strip())
+
+def _parse_generate_response(response):
+    """Parsed JSON answer of a 200 generateContent response - the one decode path for every call."""
+    result = _json_loads(response.content)
+    return _parse_json_text(result['candidates'][0]['content']['parts'][0]['text'])
+
+class ScriptGenerator:
+    def __init__(self):
+        self.api_key = os.getenv("GEMINI_API_KEY")
+        if not self.api_key:
+            print("Warning: GEMINI_API_KEY not found.")
+        self.base_url = "https://generativelanguage.googleapis.com"
+        # If we hit quota / config issues, we can short‑circuit further Gemini calls
+        # in this run and rely on the local backup template instead. Without a key
+        # that is every call from the start - no discovery or other network I/O.
+        self.gemini_disabled = not self.api_key
+        self._models = None  # (name, version) list from the last discovery
+        self._models_ts = 0
+        # Fast path: call this model directly (no ListModels round trip). Discovery
+        # only runs if it turns out not to exist.
+        self.preferred_model = os.getenv("GEMINI_MODEL") or "gemini-2.0-flash"
+        self.preferred_version = os.getenv("GEMINI_API_VERSION") or "v1beta"
+        self._preferred_missing = False
+        self._json_mode = True  # Off once a model rejects responseMimeType (see _with_json_mode)
+        # Exact-match cache of Gemini answers: the same candidate pool (pick_and_generate_script),
+        # article + model (generate_script) or title set (pick_best_article) - common when
+        # runs overlap or a pipeline is retried - reuses the previous answer.
+        self.cache_dir = os.path.join(".cache", "scripts")
+        self.cache_ttl_hours = 6
+        # Keep-alive session: model discovery + generateContent reuse one TLS connection.
+        # With httpx[http2] it is an HTTP/2 client, so hedged requests to several
+        # models multiplex over that one connection instead of opening new ones.
+        # Pool sized for hedged/concurrent calls; connection errors are retried by
+        # the transport (and, on requests, 5xx on GET). 429/5xx answers to POSTs
+        # are retried by _post_streamed, the same way for both clients.
+        if httpx is not None:
+            transport = httpx.HTTPTransport(http2=True, retries=3, limits=httpx.Limits(max_connections=16))
+            self._session = httpx.Client(transport=transport, timeout=httpx.Timeout(GEMINI_TIMEOUT[1], connect=GEMINI_TIMEOUT[0]),
+                                         headers={"Content-Type": "application/json"})
+        else:
+            self._session = requests.Session()
+            self._session.headers.update({"Content-Type": "application/json"})
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=16, max_retries=Retry(
+                total=3, backoff_factor=0.3, status_forcelist=[500, 502, 503, 504], raise_on_status=False))
+            self._session.mount("https://", adapter)
+            self._session.mount("http://", adapter)
+        atexit.register(self.close)
+
+    def close(self):
+        """Closes the pooled connections (also registered with atexit)."""
+        self._session.close()
+
+    def _candidate_models(self):
+        """
+        (name, version) pairs to call, in priority order: the configured
+        GEMINI_MODEL alone, or the discovered list once that model is missing.
+        """
+        if self.gemini_disabled:
+            return []
+        if not self._preferred_missing:
+            return [(self.preferred_model, self.preferred_version)]
+        return self._discover_models()
+
+    def _model_missing(self, models, response):
+        """
+        True if models is the GEMINI_MODEL fast path and response says that model
+        doesn't exist (404 / 400 "not found"); the fast path is then switched off.
+        """
+        if response is None or models != [(self.preferred_model, self.preferred_version)]:
+            return False
+        if response.status_code == 404 or (response.status_code == 400 and "not found" in response.text.lower()):
+            if not self._preferred_missing:
+                print(f"[Gemini] Model {self.preferred_model} ({self.preferred_version}) not found. Discovering available models...")
+                self._preferred_missing = True
+            return True
+        return False
+
+    def _discover_model(self):
+        """
+        Dynamically asks Gemini API: "What models can I use?"
+        Returns the best available model name.
+        """
+        models = self._discover_models()
+        return models[0] if models else None
+
+    def _discover_models(self):
+        """
+        Same discovery, but returns up to GEMINI_MAX_MODELS (name, version)
+        pairs in priority order, for hedged requests. Empty list on failure.
+        Cached for GEMINI_MODELS_TTL: on self first, then GEMINI_MODELS_FILE.
+        """
+        if self.gemini_disabled:
+            return []
+        if self._models and time.time() - self._models_ts < GEMINI_MODELS_TTL:
+            return self._models
+        if self._load_cached_models():
+            return self._models
+        models = self._list_models()
+        if models:
+            self._save_cached_models(models)
+        return models
+
+    def _load_cached_models(self):
+        try:
+            if time.time() - os.path.getmtime(GEMINI_MODELS_FILE) > GEMINI_MODELS_TTL:
+                return False
+            with open(GEMINI_MODELS_FILE, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+            self._models = [tuple(m) for m in entry["models"]]
+            self._models_ts = entry["ts"]
+            return bool(self._models)
+        except (OSError, ValueError, KeyError, TypeError):
+            return False  # Missing / unreadable -> discover
+
+    def _save_cached_models(self, models):
+        self._models, self._models_ts = models, time.time()
+        try:
+            os.makedirs(os.path.dirname(GEMINI_MODELS_FILE), exist_ok=True)
+            tmp_path = f"{GEMINI_MODELS_FILE}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"ts": self._models_ts, "models": models}, f)
+            os.replace(tmp_path, GEMINI_MODELS_FILE)
+        except OSError as e:
+            print(f"[Cache] Model list write failed: {e}")
+
+    def _list_models(self):
+        """The ListModels request + priority ranking behind _discover_models."""
+        try:
+            # We check v1beta first as it has the newer models
+            url = f"{self.base_url}/v1beta/models?key={self.api_key}"
+            print(f"Discovering models from: {url.split('?')[0]}...")
+            
+            response = self._session.get(url, timeout=GEMINI_TIMEOUT)
+            if response.status_code != 200:
+                print(f"ListModels failed: {response.status_code} - {response.text}")
+                return []
+            
+            data = _json_loads(response.content)
+            available_models = []
+            
+            for m in data.get('models', []):
+                # We need a model that supports 'generateContent'
+                if "generateContent" in m.get("supportedGenerationMethods", []):
+                    # Strip 'models/' prefix if present for clean usage
+                    name = m['name'].replace("models/", "")
+                    available_models.append(name)
+            
+            print(f"Available Models: {available_models}")
+            
+            # Priority Logic: Prefer 2.0 Flash -> 1.5 Flash -> Others
+            # Note: "gemini-pro-latest" might be v1beta only. 
+            # Safer to default all to v1beta unless explicitly known as v1 legacy.
+            
+            ranked = []
+            for m in available_models:
+                if "gemini-2.0-flash" in m: ranked.append((m, "v1beta"))
+            for m in available_models:
+                if "gemini-1.5-flash" in m: ranked.append((m, "v1beta"))
+            
+            # If we fall back to generic names, be careful
+            for m in available_models:
+                if "gemini-pro" in m: 
+                    # check if it's the legacy v1 or new v1beta
+                    if "latest" in m or "1.5" in m:
+                        ranked.append((m, "v1beta"))
+                    else:
+                        ranked.append((m, "v1"))
+                
+            # If nothing specific found, take the first valid one and try v1beta (most modern)
+            if not ranked and available_models:
+                ranked.append((available_models[0], "v1beta"))
+                
+            return ranked[:GEMINI_MAX_MODELS]
+            
+        except Exception as e:
+            print(f"Model discovery error: {e}")
+            return []
+
+    def _post_hedged(self, models, payload):
+        """
+        POSTs payload to models[0]; if it is still pending after GEMINI_HEDGE_DELAY
+        (or answers with an error), the next model is fired alongside it.
+        Returns the first 200 response, else the last response received
+        (None if every request raised).
+        """
+        pool = ThreadPoolExecutor(max_workers=len(models))
+        remaining = iter(models)
+        pending, last = set(), None
+
+        def fire():
+            model = next(remaining, None)
+            if model is not None:
+                model_name, version = model
+                url = f"{self.base_url}/{version}/models/{model_name}:streamGenerateContent?alt=sse&key={self.api_key}"
+                pending.add(pool.submit(self._post_streamed, url, payload))
+                return model_name
+
+        try:
+            fire()
+            while pending:
+                done, _ = wait(pending, timeout=GEMINI_HEDGE_DELAY, return_when=FIRST_COMPLETED)
+                for future in done:
+                    pending.discard(future)
+                    try:
+                        response = future.result()
+                    except Exception as e:
+                        print(f"[Gemini] Request exception: {e}")
+                        continue
+                    if response.status_code == 200:
+                        return response
+                    last = response
+                # Slow or failed -> bring in the next model (running ones keep going)
+                hedge = fire()
+                if hedge:
+                    print(f"[Gemini] Also trying {hedge}...")
+        finally:
+            # Don't wait for the losers; their responses are simply dropped
+            pool.shutdown(wait=False, cancel_futures=True)
+        return last
+
+    def _json_mode_for(self, models):
+        return self._json_mode and all(version == "v1beta" for _, version in models)
+
+    def _post_streamed(self, url, payload):
+        """_stream_once, retried on GEMINI_RETRY_STATUSES (see _retry_delay)."""
+        for attempt in range(GEMINI_RETRIES):
+            response = self._stream_once(url, payload)
+            if response.status_code not in GEMINI_RETRY_STATUSES:
+                return response
+            delay = _retry_delay(response, attempt)
+            print(f"[Gemini] HTTP {response.status_code}, retrying in {delay:.1f}s...")
+            time.sleep(delay)
+        return self._stream_once(url, payload)
+
+    def _stream_once(self, url, payload):
+        """
+        POSTs to :streamGenerateContent (SSE). Text parts are joined as they arrive and
+        the stream is closed as soon as they form a complete JSON value, without
+        waiting for the tail of the reply. Returns a response-like object whose
+        .content is a generateContent-shaped body, so callers parse it unchanged;
+        non-200 responses are returned as-is.
+        """
+        # Pre-encoded body; Content-Type: application/json is a session header
+        data = _json_dumps(payload)
+        if httpx is not None:
+            stream = self._session.stream("POST", url, content=data)
+        else:
+            stream = self._session.post(url, data=data, stream=True, timeout=GEMINI_TIMEOUT)
+        with stream as response:
+            if response.status_code != 200:
+                # Load the error body (for .text / "not found" checks) before the stream closes
+                if httpx is not None:
+                    response.read()
+                else:
+                    response.content
+                return response
+            parts = []
+            for line in response.iter_lines():
+                if isinstance(line, bytes):
+                    line = line.decode("utf-8")
+                if not line.startswith("data:"):
+                    continue
+                chunk = _json_loads(line[5:])
+                for candidate in chunk.get("candidates", [])[:1]:
+                    parts.extend(p.get("text", "") for p in candidate.get("content", {}).get("parts", []))
+                try:
+                    _parse_json_text("".join(parts))
+                    break  # Complete JSON - drop the rest of the stream
+                except ValueError:
+                    pass
+        body = _json_dumps({"candidates": [{"content": {"parts": [{"text": "".join(parts)}]}}]})
+        return SimpleNamespace(status_code=200, content=body, text=body.decode("utf-8"))
+
+    def _with_json_mode(self, models, payload):
+        """
+        payload plus generationConfig.responseMimeType=application/json when every
+        model is on v1beta (v1 rejects it): Gemini then returns bare JSON, no prose
+        or ``` fences. Unchanged once a model has rejected JSON mode.
+        """
+        if self._json_mode_for(models):
+            return {**payload, "generationConfig": {"responseMimeType": "application/json"}}
+        return payload
+
+    def _json_mode_rejected(self, models, response):
+        """
+        True if a JSON-mode request got a 400 that names the JSON-mode fields; JSON mode
+        is then off for this instance. Other 400s (bad key, prompt too long) leave it on.
+        """
+        if response is None or response.status_code != 400 or not self._json_mode_for(models):
+            return False
+        if not any(field in response.text for field in _JSON_MODE_FIELDS):
+            return False
+        print("[Gemini] JSON mode rejected (400). Retrying in text mode...")
+        self._json_mode = False
+        return True
+
+    def _post_gemini(self, models, payload):
+        """
+        _post_hedged in JSON mode (see _with_json_mode), retried once for each fallback:
+        - GEMINI_MODEL doesn't exist (404 / 400 "not found") -> the discovered models
+        - JSON mode rejected (400) -> plain text mode (replies are still fence-stripped)
+        """
+        response = self._post_hedged(models, self._with_json_mode(models, payload))
+        if self._model_missing(models, response):
+            models = self._discover_models()
+            if not models:
+                return response
+            response = self._post_hedged(models, self._with_json_mode(models, payload))
+        if self._json_mode_rejected(models, response):
+            response = self._post_hedged(models, payload)
+        return response
+
+    def _pool_cache_key(self, articles):
+        """Fingerprint of a candidate pool (order-independent)."""
+        ids = sorted(str(a.get("article_id", "")) for a in articles)
+        return hashlib.sha256(json.dumps(ids, sort_keys=True).encode("utf-8")).hexdigest()
+
+    def _article_cache_key(self, model_name, news_article):
+        """Fingerprint of one script request: model + title + the first 1 KB of the text sent."""
+        title = news_article.get('title', 'Breaking News')
+        raw = f"{model_name}|{title}|{_article_text(news_article)[:1024]}"
+        return "gen_" + hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def _load_cached(self, cache_key):
+        """Cached entry for cache_key, or None if missing/expired."""
+        path = os.path.join(self.cache_dir, f"{cache_key}.json")
+        try:
+            if not os.path.exists(path):
+                return None
+            if time.time() - os.path.getmtime(path) > self.cache_ttl_hours * 60 * 60:
+                os.remove(path)
+                return None
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except Exception as e:
+            print(f"[Cache] Read failed: {e}")
+        return None
+
+    def _save_cached(self, cache_key, entry):
+        """Writes entry atomically (tmp + rename), so a concurrent reader never sees half a file."""
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            path = os.path.join(self.cache_dir, f"{cache_key}.json")
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(entry, f, ensure_ascii=False)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            print(f"[Cache] Write failed: {e}")
+
+    def _load_cached_script(self, cache_key, articles):
+        """Returns a cached pick+script result for this pool, or None if missing/expired."""
+        entry = self._load_cached(cache_key)
+        if not entry:
+            return None
+        for art in articles:
+            if str(art.get("article_id")) == entry.get("chosen_article_id"):
+                print("[Cache] Reusing cached script for this article pool.")
+                return {"chosen_article": art, "script": entry["script"]}
+        return None
+
+    def cached_pick(self, articles):
+        """
+        pick_and_generate_script's cached result for this pool, or None. Needs no
+        article text (the key is the article ids), so callers can skip scraping on a hit.
+        """
+        if not articles or self.gemini_disabled:
+            return None
+        return self._load_cached_script(self._pool_cache_key(articles), articles)
+
+    def _save_cached_script(self, cache_key, chosen_article, script):
+        self._save_cached(cache_key, {"chosen_article_id": str(chosen_article.get("article_id")), "script": script})
+
+    def pick_and_generate_script(self, articles):
+        """
+        COMBINED: Picks the best article AND generates the video script in ONE Gemini call.
+        This avoids hitting per-minute rate limits by reducing API calls.
+        Returns: dict with 'chosen_article' and 'script' keys, or None on failure.
+        """
+        if not articles:
+            return None
+        if self.gemini_disabled:
+            print("Gemini disabled. Using backup for first article.")
+            return {"chosen_article": articles[0], "script": self._backup_template(articles[0])}
+
+        cache_key = self._pool_cache_key(articles)
+        cached = self._load_cached_script(cache_key, articles)
+        if cached:
+            return cached
+
+        models = self._candidate_models()
+        if not models:
+            print("No model available. Using backup.")
+            return {"chosen_article": articles[0], "script": self._backup_template(articles[0])}
+
+        print(f"[COMBINED] Using Model: {models[0][0]}")
+
+        # Build listing for the prompt - FULL CONTENT for detailed scripts
+        items = []
+        for idx, art in enumerate(articles):
+            t = art.get("title", "") or ""
+            # Use FULL content (up to 4000 chars) for better context
+            d = _article_text(art, limit=4000)
+            d = d.replace("\n", " ").strip()
+            items.append(f"[{idx}] {t}\n{d}\n\n")
+        items_text = "".join(items)
+
+        prompt = _PICK_AND_SCRIPT_PROMPT.format(count=len(articles), items_text=items_text)
+
+        # RETRY LOGIC: the first call goes out immediately. Rate limits / server errors
+        # are already retried briefly inside _post_streamed. A 429 that is still there
+        # means the per-minute quota is spent, so wait it out (see _quota_delay) and
+        # try again; a 5xx (or no response at all) ends the loop. An unusable answer
+        # (bad JSON, other error) is retried right away.
         max_retries = 3
-        base_delay = 15  # Increased base delay
         
-        url = f"{self.base_url}/{version}/models/{model_name}:generateContent?key={self.api_key}"
         payload = {"contents": [{"parts": [{"text": prompt}]}]}
 
         for attempt in range(max_retries):
             try:
-                # Pre-call delay (longer on retries)
-                wait_time = base_delay * (2 ** attempt)  # 10s, 20s, 40s
-                print(f"[Gemini] Attempt {attempt + 1}/{max_retries}, waiting {wait_time}s...")
-                time.sleep(wait_time)
-
-                response = requests.post(url, json=payload, headers={"Content-Type": "application/json"})
+                print(f"[Gemini] Attempt {attempt + 1}/{max_retries}...")
+                response = self._post_gemini(models, payload)
 
-                if response.status_code == 200:
-                    result = response.json()
-                    raw_text = result['candidates'][0]['content']['parts'][0]['text']
-                    clean_text = raw_text.replace('```json', '').replace('```', '').strip()
-                    data = json.loads(clean_text)
+                if response is None:
+                    print("[Gemini] No response from any model.")
+                    break
+                elif response.status_code == 200:
+                    data = _parse_generate_response(response)
 
                     chosen_idx = int(data.get("chosen_index", 0))
                     if chosen_idx < 0 or chosen_idx >= len(articles):
@@ -216,48 +703,29 @@ FINAL REMINDER: If you write "Voice" or "name =" in script field, it will be spo
                     
                     # CLEAN THE SCRIPT SEGMENTS AT SOURCE (FIRST LINE OF DEFENSE)
                     if "segments" in script:
-                        import re
                         for seg in script["segments"]:
                             if "script" in seg:
-                                s = seg["script"]
-                                # DIRECT REMOVALS (exact patterns)
-                                for bad in ["Voice name =", "voice name =", "Voice Name =",
-                                            "Speak voice name =", "speak voice name =", "speek voice name =",
-                                            "Voice =", "voice =", "Name =", "name =",
-                                            "Speak voice =", "Inner Engineer", "voice = Inner Engineer"]:
-                                    s = s.replace(bad, "")
-                                # Remove Voice:/Narrator:/etc prefixes
-                                s = re.sub(r'^(Voice|Narrator|Speaker|Audio|VO|Name)\s*[:=\-]?\s*', '', s, flags=re.IGNORECASE)
-                                # Remove ANY word followed by = at start
-                                s = re.sub(r'^[A-Za-z]+\s*[:=]\s*', '', s.strip())
-                                # Remove emotion tags
-                                s = re.sub(r'[\(\[\{](Happy|Sad|Excited|Serious|Urgent|Warm|Caution|Pause|Beat)[\)\]\}]', '', s, flags=re.IGNORECASE)
-                                # Remove standalone Voice/Name/Speak voice name/typos
-                                s = re.sub(r'\b(Voice|Name)\b', '', s, flags=re.IGNORECASE)
-                                s = re.sub(r'\bInner\s*Engineer\b', '', s, flags=re.IGNORECASE)
-                                s = re.sub(r'\b(ingenier|inginer)\b', '', s, flags=re.IGNORECASE)
-                                s = re.sub(r'\bSpeak\s+voice\s+name\b', '', s, flags=re.IGNORECASE)
-                                s = re.sub(r'\bSpeak\s+voice\b', '', s, flags=re.IGNORECASE)
-                                s = re.sub(r'\bspeek\s+voice\s+name\b', '', s, flags=re.IGNORECASE)
-                                # Clean double spaces
-                                s = re.sub(r'\s+', ' ', s).strip()
-                                seg["script"] = s
+                                seg["script"] = clean_script_text(seg["script"])
                     
                     print(f"[Gemini] Success on attempt {attempt + 1}")
+                    self._save_cached_script(cache_key, chosen_article, script)
                     return {"chosen_article": chosen_article, "script": script}
 
                 elif response.status_code == 429:
-                    print(f"[Gemini] Rate limited (429). Will retry after backoff...")
-                    # Continue to next iteration (retry with longer delay)
-                    continue
+                    if attempt == max_retries - 1:
+                        break
+                    wait_time = _quota_delay(response, attempt)
+                    print(f"[Gemini] Rate limited (429). Waiting {wait_time:.0f}s for the quota...")
+                    time.sleep(wait_time)
+                elif response.status_code in GEMINI_RETRY_STATUSES:
+                    print(f"[Gemini] Server error ({response.status_code}) after retries.")
+                    break
                 else:
                     print(f"[Gemini] Error ({response.status_code}): {response.text}")
-                    # Non-rate-limit error, try again
-                    continue
+                    # Non-rate-limit error, try again right away
 
             except Exception as e:
                 print(f"[Gemini] Exception: {e}")
-                continue
 
         # All retries exhausted - use backup
         print("[Gemini] All retries failed. Using backup template.")
@@ -265,76 +733,50 @@ FINAL REMINDER: If you write "Voice" or "name =" in script field, it will be spo
 
     def generate_script(self, news_article):
         # If Gemini is disabled (quota hit or no key), go straight to backup.
-        if self.gemini_disabled or not self.api_key:
+        if self.gemini_disabled:
             return self._backup_template(news_article)
 
-        # 1. Discover a working model
-        model_info = self._discover_model()
+        # 1. Configured model (or discover a working one)
+        models = self._candidate_models()
         
-        if not model_info:
+        if not models:
             print("CRITICAL: No usable Gemini models found. Using Backup Template.")
             return self._backup_template(news_article)
             
-        model_name, version = model_info
+        model_name, version = models[0]
+
+        # Same article + model within cache_ttl_hours (e.g. a pipeline retry) -> no API call
+        cache_key = self._article_cache_key(model_name, news_article)
+        cached = self._load_cached(cache_key)
+        if cached:
+            print("[Cache] Reusing cached script for this article.")
+            return cached
         print(f"Selected Model: {model_name} (API: {version})")
-        
+
         # 2. Build Prompt
         title = news_article.get('title', 'Breaking News')
-        # PREFER FULL SCRAPED CONTENT
-        description = news_article.get('full_content', '') or news_article.get('description', '') or news_article.get('content', '')[:500]
-        
-        prompt_text = f"""
-You are a **top tier Indian news script writer** for viral vertical videos (YouTube Shorts, Reels).
-Your goal is to make this video go VIRAL (10000% engagement).
-
-Strictly output JSON only, no extra text:
-{{
-    "headline": "CLICKBAIT TITLE (max 60 chars) - Use ALL CAPS, Emojis, and Questions. MUST SHOCK THE VIEWER.",
-    "ticker_text": "Breaking News • Viral Update • Must Watch",
-    "segments": [
-        {{ "visual": "Slide 1 text (Max 15 words)", "script": "Spoken sentence for this slide." }},
-        {{ "visual": "Slide 2 text (Max 15 words)", "script": "Spoken sentence for this slide." }},
-        {{ "visual": "Slide 3 text (Max 15 words)", "script": "Spoken sentence for this slide." }}
-    ],
-    "viral_description": "First 3 lines must be a CLIFFHANGER HOOK! Then detailed summary. Use emotional language (Shocking, Heartbreaking, Amazing). Add 'Subscribe for more updates'.",
-    "viral_tags": ["#Shorts", "#Viral", "#Trending", "#News", "SPECIFIC_ENTITY_TAGS_HERE"],
-    "video_search_keywords": ["keyword1", "keyword2", "keyword3", "high search volume terms"]
-}}
+        description = _article_text(news_article)
 
-Rules for "viral_tags":
-- DYNAMIC: Include specific names of people, places, and events mentioned in the article (e.g., #Modi, #ViratKohli, #DelhiRains).
-- TRENDING: Mix high-volume generic tags (#India) with niche specific tags.
-- QUANTITY: Generate at least 15 high-impact tags.
-
-Rules for "segments":
-- Create 3-5 segments that flow logically.
-- **SYNC IS CRITICAL**: The "script" text MUST match exactly what should be spoken while the "visual" text is shown.
-- **NO FILLER**: Start immediately with the news.
-- Tone: Urgent, Insider, Fast-paced, Sensational.
-- MAKE IT SOUND VIRAL. Not boring news.
-
-Rules for visual text:
-- NOT subtitles. Visual Headlines. Large font, few words.
-        """
+        prompt_text = _SCRIPT_PROMPT.format(title=title, description=description)
 
         # 3. Call API
         try:
-            url = f"{self.base_url}/{version}/models/{model_name}:generateContent?key={self.api_key}"
             payload = {
                 "contents": [{"parts": [{"text": prompt_text}]}],
-                # We omit generationConfig to be safe across all model types (v1 vs v1beta)
-                # and rely on the robust prompt for JSON
+                # generationConfig (JSON mode) is added per call by _with_json_mode,
+                # only for v1beta models - v1 rejects it and relies on the prompt
             }
-            
-            response = requests.post(url, json=payload, headers={"Content-Type": "application/json"})
-            
-            if response.status_code == 200:
-                result = response.json()
-                raw_text = result['candidates'][0]['content']['parts'][0]['text']
-                clean_text = raw_text.replace('```json', '').replace('```', '').strip()
-                return json.loads(clean_text)
-                clean_text = raw_text.replace('```json', '').replace('```', '').strip()
-                return json.loads(clean_text)
+
+            response = self._post_gemini(models, payload)
+
+            if response is None:
+                print("Generation failed: no response from any model")
+                return self._backup_template(news_article)
+            elif response.status_code == 200:
+                script = _parse_generate_response(response)
+                # A parsed Gemini script is cached (backup templates never are)
+                self._save_cached(cache_key, script)
+                return script
             elif response.status_code == 429:
                 # Quota exhausted – log once and disable Gemini for the rest of this run.
                 self.gemini_disabled = True
@@ -343,14 +785,11 @@ Rules for visual text:
             else:
                 print(f"Generation failed ({response.status_code}): {response.text}")
                 return self._backup_template(news_article)
-                
+
         except Exception as e:
             print(f"Generation Exception: {e}")
             return self._backup_template(news_article)
 
-        if self.gemini_disabled or not self.api_key:
-             return self._backup_template(news_article)
-
     def _backup_template(self, article):
         """
         Last resort: Returns a valid script object so the pipeline DOES NOT CRASH.
@@ -378,22 +817,13 @@ Rules for visual text:
         # Prioritize full scraped content -> description -> fallback
         content_source = article.get('full_content', '') or article.get('description', '') or "More details to follow."
         
-        # Robust HTML cleaning using BeautifulSoup
-        try:
-            from bs4 import BeautifulSoup
-            soup = BeautifulSoup(content_source, "html.parser")
-            content_source = soup.get_text(separator=" ", strip=True)
-        except ImportError:
-            # Fallback if bs4 fails (though it should be installed)
-            content_source = content_source.replace("<p>", "").replace("</p>", "").replace("<b>", "").replace("</b>", "").replace("\n", " ")
-        except Exception as e:
-            print(f"Error cleaning HTML: {e}")
-            # Minimal cleanup
-            content_source = content_source.replace("<", " ").replace(">", " ")
+        # HTML cleaning (lxml, regex fallback)
+        content_source = _clean_html(content_source)
         
         full_title = str(title)
         
-        # Build segments of roughly 150 chars (approx 25-30 words) - LONGER content
+        # Build segments of roughly 150 chars (approx 25-30 words) - LONGER content,
+        # max 5 segments for video length
         segments = []
         words = content_source.split(" ")
         current_segment = []
@@ -406,19 +836,18 @@ Rules for visual text:
                     "visual": text,
                     "script": text  # Script matches visual for backup
                 })
+                if len(segments) == 5:
+                    break  # Only 5 are used - don't walk the rest of a long article
                 current_segment = [word]
                 current_len = len(word)
             else:
                 current_segment.append(word)
                 current_len += len(word) + 1
         
-        if current_segment:
+        if current_segment and len(segments) < 5:
             text = " ".join(current_segment)
             segments.append({"visual": text, "script": text})
             
-        # Limit to max 5 segments for video length
-        segments = segments[:5] 
-        
         # If very short, ensure at least 1
         if not segments:
              segments = [{"visual": content_source[:100], "script": content_source}]
@@ -438,17 +867,32 @@ Rules for visual text:
         """
         Uses Gemini to choose the most viral/engaging article out of a small list.
         Returns the chosen article dict, or None on failure.
+        Untitled articles are never candidates; with only one left there is
+        nothing to rank, so it is returned without an API call.
         """
+        articles = [art for art in articles if (art.get("title", "") or "").strip()]
         if not articles:
             return None
-        if self.gemini_disabled or not self.api_key:
+        if len(articles) == 1:
+            return articles[0]
+        if self.gemini_disabled:
             print("Gemini disabled or no API key; skipping AI article ranking.")
             return None
-        model_info = self._discover_model()
-        if not model_info:
+        models = self._candidate_models()[:1]
+        if not models:
             print("No model for article ranking, falling back to random.")
             return None
-        model_name, version = model_info
+        model_name, version = models[0]
+
+        # Same candidate titles + model -> previous ranking is reused
+        titles = sorted(art.get("title", "") or "" for art in articles)
+        cache_key = "rank_" + hashlib.sha256(json.dumps([model_name, titles]).encode("utf-8")).hexdigest()
+        cached = self._load_cached(cache_key)
+        if cached:
+            for art in articles:
+                if (art.get("title", "") or "") == cached.get("chosen_title"):
+                    print("[Cache] Reusing cached article ranking.")
+                    return art
 
         # Build compact listing for prompt
         items = []
@@ -459,21 +903,15 @@ Rules for visual text:
             items.append(f"{idx}: {t} | {d_short}")
         joined = "\n".join(items)
 
-        prompt = f"""
-You are helping choose which news story will go most viral as a short vertical video for 'Logic Vault'.
-
-Here are candidate stories (index: title | short description):
-{joined}
-
-Think about which one is the most emotionally engaging, surprising, or highly relevant for a general audience today.
-Return ONLY JSON of the form: {{"chosen_index": <NUMBER>}} with no extra text.
-        """
+        prompt = _RANKING_PROMPT.format(items=joined)
         try:
-            url = f"{self.base_url}/{version}/models/{model_name}:generateContent?key={self.api_key}"
             payload = {
                 "contents": [{"parts": [{"text": prompt}]}],
             }
-            resp = requests.post(url, json=payload, headers={"Content-Type": "application/json"})
+            resp = self._post_gemini(models, payload)
+            if resp is None:
+                print("Article ranking failed: no response")
+                return None
             if resp.status_code == 429:
                 # Quota exhausted for ranking as well – disable Gemini to avoid noisy logs.
                 self.gemini_disabled = True
@@ -482,12 +920,10 @@ Return ONLY JSON of the form: {{"chosen_index": <NUMBER>}} with no extra text.
             if resp.status_code != 200:
                 print(f"Article ranking failed: {resp.status_code} - {resp.text}")
                 return None
-            data = resp.json()
-            raw = data["candidates"][0]["content"]["parts"][0]["text"]
-            clean = raw.replace("```json", "").replace("```", "").strip()
-            obj = json.loads(clean)
+            obj = _parse_generate_response(resp)
             idx = int(obj.get("chosen_index", 0))
             if 0 <= idx < len(articles):
+                self._save_cached(cache_key, {"chosen_title": articles[idx].get("title", "") or ""})
                 return articles[idx]
             return None
         except Exception as e: